@@ -6,16 +6,152 @@ Implements the complete STTF standard for SAT CNF transformations.
 """
 
 import re
+import sys
+import copy
 import json
+from array import array
+from collections import ChainMap, Counter
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Tuple, Any, Optional
 
 
+# Precompiled line grammars for reconstruct.map
+_RE_REV_MAP = re.compile(r"rev_map\s+(\d+)\s*->\s*(\d+)")
+_RE_REV_ELIM = re.compile(r"rev_elim\s+(\d+)\s*=\s*(true|false)")
+_RE_REV_ELIM_EXPR = re.compile(r"rev_elim_expr\s+(\d+)\s*=\s*(.*)")
+_RE_REV_CLAUSE_ADD = re.compile(r"rev_clause_add\s+(\d+)\s+(\[.*\])")
+_RE_INT_LIST = re.compile(r"-?\d+")
+
+# Canonical transform.log opcodes
+_VALID_OPCODES = frozenset({
+    "var_rename", "var_elim", "var_subst",
+    "clause_remove", "clause_add", "clause_strengthen",
+    "unit_derive"
+})
+
+# Top-level keys every manifest.json must carry
+_MANIFEST_KEYS = ("version", "generator", "original", "simplified")
+
+# Reverse rule type ids used by the lift_model dispatch loop
+_REV_MAP, _REV_ELIM, _REV_ELIM_EXPR, _REV_ELIM_SHARED, _REV_ELIM_CACHED = range(5)
+
+# Maximum number of expression results kept across lift_model calls
+_EXPR_CACHE_SIZE = 4096
+
+# Expr postfix opcodes, executed by Expr._run. AND/OR compile to a
+# conditional skip placed between their operands: _AND_THEN arg skips the
+# arg instructions of the right operand if the left one is False (keeping
+# it as the result), else pops it; _OR_ELSE likewise on True.
+_PUSH_VAR, _PUSH_NEG, _NOT, _AND_THEN, _OR_ELSE, _XOR, _CONST = range(7)
+_SKIP_OPCODES = {"AND": _AND_THEN, "OR": _OR_ELSE}
+
+
+def pack_model(model: Dict[int, bool]) -> Tuple[int, int]:
+    """
+    Pack a {var: bool} model into (mask, values) bit sets.
+    
+    Bit v of mask is set if variable v is assigned; bit v of values is set
+    if it is True.
+    """
+    if not model:
+        return 0, 0
+    size = max(model) + 1
+    mask = ["0"] * size
+    values = ["0"] * size
+    for v, val in model.items():
+        mask[v] = "1"
+        if val:
+            values[v] = "1"
+    # Strings are little-endian by variable; int() wants the high bit first
+    return int("".join(reversed(mask)), 2), int("".join(reversed(values)), 2)
+
+
+def unpack_model(mask: int, values: int) -> Dict[int, bool]:
+    """Unpack (mask, values) bit sets into a {var: bool} model."""
+    m = bin(mask)[:1:-1]
+    vals = bin(values)[:1:-1]
+    n = len(vals)
+    return {v: v < n and vals[v] == "1" for v, bit in enumerate(m) if bit == "1"}
+
+
+def _read_dimacs(path: Path) -> List[List[int]]:
+    """
+    Parse the clauses of a DIMACS CNF file.
+    
+    The file is read in one call; comment and header lines are dropped and
+    the remaining tokens are converted in bulk, then cut into clauses at
+    each 0 terminator with list.index (a C-level scan).
+    """
+    body = b" ".join(
+        line for line in path.read_bytes().splitlines()
+        if line.lstrip()[:1] not in (b"c", b"p")
+    )
+    lits = list(map(int, body.split()))
+    
+    clauses = []
+    start = 0
+    while True:
+        try:
+            end = lits.index(0, start)
+        except ValueError:
+            break
+        if end > start:
+            clauses.append(lits[start:end])
+        start = end + 1
+    if start < len(lits):
+        clauses.append(lits[start:])
+    return clauses
+
+
 class Expr:
     """Boolean expression evaluator for substitution and model reconstruction."""
     
+    # Operator name -> arity
+    OPERATORS = {"NOT": 1, "AND": 2, "OR": 2, "XOR": 2}
+    
+    # Source templates for compile(): the model is a dict m of booleans
+    _EMIT_BOOL = {
+        "POS": "m[{v}]", "NEG": "(not m[{v}])",
+        "TRUE": "True", "FALSE": "False",
+        "NOT": "(not {a})", "AND": "({a} and {b})",
+        "OR": "({a} or {b})", "XOR": "({a} ^ {b})",
+    }
+    
+    # Source templates for eval_bits(): bit v of the int v holds variable v
+    _EMIT_BITS = {
+        "POS": "((v >> {v}) & 1)", "NEG": "(((v >> {v}) & 1) ^ 1)",
+        "TRUE": "1", "FALSE": "0",
+        "NOT": "({a} ^ 1)", "AND": "({a} & {b})",
+        "OR": "({a} | {b})", "XOR": "({a} ^ {b})",
+    }
+    
+    # Source templates for eval_batch(): c[v] holds variable v of every
+    # model, one model per bit lane; o has every lane set
+    _EMIT_LANES = {
+        "POS": "c[{v}]", "NEG": "(c[{v}] ^ o)",
+        "TRUE": "o", "FALSE": "0",
+        "NOT": "({a} ^ o)", "AND": "({a} & {b})",
+        "OR": "({a} | {b})", "XOR": "({a} ^ {b})",
+    }
+    
     def __init__(self, text: str):
         self.text = text.strip()
+        # Parse once per distinct text; every eval() reuses the result
+        self.root, code = _compile_text(self.text)
+        self._analyze(code)
+        # Specialized closure, built on demand by compile()
+        self._fn = None
+    
+    def _analyze(self, code: Optional[Tuple] = None):
+        """Record the variables the tree reads, its literal count and code."""
+        self.free_vars = self._node_vars(self.root)
+        self._var_order = tuple(sorted(self.free_vars))
+        self._lit_count = sum(1 for _ in self._iter_literals(self.root))
+        self._var_mask = sum(1 << v for v in self.free_vars)
+        self._bits_fn = None
+        self._lanes_fn = None
+        self.code = code if code is not None else self._postfix(self.root)
     
     def eval(self, model: Dict[int, bool]) -> bool:
         """
@@ -30,56 +166,675 @@ class Expr:
         Raises:
             ValueError: If variable undefined in model or expression invalid
         """
-        return self._eval(self.text, model)
+        if self._fn is not None:
+            try:
+                return self._fn(model)
+            except KeyError as e:
+                raise ValueError(f"Undefined variable {e.args[0]} in model")
+        return self._run(model)
+    
+    def _run(self, model: Dict[int, bool]) -> bool:
+        """Execute the postfix program over a value stack, short-circuiting."""
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        get = model.get
+        code = self.code
+        n = len(code)
+        pc = 0
+        while pc < n:
+            op, arg = code[pc]
+            pc += 1
+            if op <= _PUSH_NEG:
+                val = get(arg, None)
+                if val is None:
+                    raise ValueError(f"Undefined variable {arg} in model")
+                push((not val) if op == _PUSH_NEG else val)
+            elif op == _NOT:
+                stack[-1] = not stack[-1]
+            elif op == _AND_THEN:
+                if stack[-1]:
+                    pop()
+                else:
+                    pc += arg
+            elif op == _OR_ELSE:
+                if stack[-1]:
+                    pc += arg
+                else:
+                    pop()
+            elif op == _XOR:
+                b = pop()
+                stack[-1] = stack[-1] ^ b
+            else:
+                push(arg)
+        return stack[0]
+    
+    @staticmethod
+    def _postfix(root: Tuple) -> Tuple[Tuple[int, Any], ...]:
+        """Lower a node tree to (opcode, arg) postfix form, iteratively."""
+        code = []
+        # Entries are (node, state): None on first visit, "end" once the
+        # operands are emitted, or the index of an AND/OR skip to patch
+        stack = [(root, None)]
+        while stack:
+            node, state = stack.pop()
+            op = node[0]
+            if op == "LIT":
+                code.append((_PUSH_NEG if node[2] else _PUSH_VAR, node[1]))
+            elif op == "CONST":
+                code.append((_CONST, node[1]))
+            elif state is None:
+                if op in _SKIP_OPCODES:
+                    # Left operand, then the skip, then the right operand
+                    stack.append((node, "split"))
+                    stack.append((node[1], None))
+                else:
+                    stack.append((node, "end"))
+                    stack.extend((child, None) for child in reversed(node[1:]))
+            elif state == "split":
+                stack.append((node, len(code)))
+                stack.append((node[2], None))
+                code.append(None)
+            elif state == "end":
+                code.append((_NOT if op == "NOT" else _XOR, None))
+            else:
+                code[state] = (_SKIP_OPCODES[op], len(code) - state - 1)
+        return tuple(code)
+    
+    @property
+    def is_constant(self) -> bool:
+        """True if the expression reads no variables (e.g. after fold())."""
+        return self.root[0] == "CONST"
+    
+    def fold(self, consts: Dict[int, bool]) -> "Expr":
+        """
+        Partially evaluate against variables with known constant values.
+        
+        Literals over variables in consts become constants, which are then
+        propagated (AND(False, x) -> False, XOR(True, x) -> NOT(x), ...).
+        
+        Args:
+            consts: Dictionary of variables whose values are fixed
+            
+        Returns:
+            self if nothing folded, otherwise a new Expr (compiled if self
+            was) with the same text and a smaller node tree
+        """
+        root = self._fold_node(self.root, consts)
+        if root is self.root:
+            return self
+        folded = Expr.__new__(Expr)
+        folded.text = self.text
+        folded.root = root
+        folded._analyze()
+        folded._fn = None
+        if self._fn is not None:
+            folded.compile()
+        return folded
+    
+    def _fold_node(self, node: Tuple, consts: Dict[int, bool]) -> Tuple:
+        """Fold a node tree bottom-up, iteratively (deep trees are allowed)."""
+        results = []
+        stack = [(node, False)]
+        while stack:
+            node, expanded = stack.pop()
+            op = node[0]
+            if op == "CONST":
+                results.append(node)
+                continue
+            if op == "LIT":
+                if node[1] in consts:
+                    val = consts[node[1]]
+                    node = ("CONST", (not val) if node[2] else bool(val))
+                results.append(node)
+                continue
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node[1:]))
+                continue
+            
+            if op == "NOT":
+                a = results.pop()
+                if a[0] == "CONST":
+                    results.append(("CONST", not a[1]))
+                else:
+                    results.append(node if a is node[1] else ("NOT", a))
+                continue
+            
+            b = results.pop()
+            a = results.pop()
+            if a[0] != "CONST" and b[0] == "CONST":
+                # All three operators are commutative; keep the constant first
+                a, b = b, a
+            if a[0] == "CONST":
+                if b[0] == "CONST":
+                    if op == "AND":
+                        folded = ("CONST", a[1] and b[1])
+                    elif op == "OR":
+                        folded = ("CONST", a[1] or b[1])
+                    else:
+                        folded = ("CONST", a[1] != b[1])
+                elif op == "AND":
+                    folded = b if a[1] else a
+                elif op == "OR":
+                    folded = a if a[1] else b
+                else:
+                    folded = ("NOT", b) if a[1] else b
+            elif a is node[1] and b is node[2]:
+                folded = node
+            else:
+                folded = (op, a, b)
+            results.append(folded)
+        return results[0]
+    
+    def reorder(self, prob_true: Dict[int, float]) -> "Expr":
+        """
+        Reorder AND/OR operands so evaluation short-circuits early.
+        
+        Treating variables as independent, each subtree's probability of
+        being True is estimated from prob_true (0.5 for variables not in
+        it); AND then tests its likelier-False operand first and OR its
+        likelier-True one.
+        
+        Args:
+            prob_true: Dictionary of variable -> estimated P(True)
+            
+        Returns:
+            self if no operands moved, otherwise a new Expr (compiled if
+            self was) with the same text
+        """
+        root, _ = self._reorder_node(self.root, prob_true)
+        if root is self.root:
+            return self
+        reordered = Expr.__new__(Expr)
+        reordered.text = self.text
+        reordered.root = root
+        reordered._analyze()
+        reordered._fn = None
+        if self._fn is not None:
+            reordered.compile()
+        return reordered
+    
+    def _reorder_node(self, node: Tuple, prob_true: Dict[int, float]) -> Tuple[Tuple, float]:
+        """Reorder a node tree bottom-up, iteratively; returns (node, P(True))."""
+        results = []
+        stack = [(node, False)]
+        while stack:
+            node, expanded = stack.pop()
+            op = node[0]
+            if op == "CONST":
+                results.append((node, float(node[1])))
+                continue
+            if op == "LIT":
+                p = prob_true.get(node[1], 0.5)
+                results.append((node, (1.0 - p) if node[2] else p))
+                continue
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node[1:]))
+                continue
+            
+            if op == "NOT":
+                a, p = results.pop()
+                results.append(((node if a is node[1] else ("NOT", a)), 1.0 - p))
+                continue
+            
+            b, pb = results.pop()
+            a, pa = results.pop()
+            if op == "AND":
+                p = pa * pb
+                swap = pb < pa
+            elif op == "OR":
+                p = pa + pb - pa * pb
+                swap = pb > pa
+            else:
+                p = pa + pb - 2.0 * pa * pb
+                swap = False
+            if swap:
+                a, b = b, a
+            elif a is node[1] and b is node[2]:
+                results.append((node, p))
+                continue
+            results.append(((op, a, b), p))
+        return results[0]
+    
+    def compile(self) -> "Expr":
+        """
+        Specialize this expression into a Python closure over the model.
+        
+        The node tree is emitted as a single Python expression, e.g.
+        AND(1, NOT(3)) becomes (m[1] and (not m[3])), so eval() runs as
+        straight-line bytecode instead of walking the tree. Expressions
+        too deeply nested for the Python compiler keep the tree walker.
+        
+        Returns:
+            self, for chaining
+        """
+        self._fn = self._build("lambda m: ", self._EMIT_BOOL) or None
+        return self
+    
+    def eval_bits(self, mask: int, values: int) -> int:
+        """
+        Evaluate against a bit-packed model.
+        
+        Args:
+            mask: Bit v set if variable v is assigned
+            values: Bit v set if variable v is True
+            
+        Returns:
+            1 or 0
+            
+        Raises:
+            ValueError: If a variable read by the expression is unassigned
+        """
+        if mask & self._var_mask != self._var_mask:
+            missing = min(v for v in self.free_vars if not (mask >> v) & 1)
+            raise ValueError(f"Undefined variable {missing} in model")
+        if self._bits_fn is None:
+            self._bits_fn = self._build("lambda v: ", self._EMIT_BITS)
+        if self._bits_fn is False:
+            # Too deep to compile: run the postfix program
+            model = {u: bool((values >> u) & 1) for u in self.free_vars}
+            return int(self._run(model))
+        return self._bits_fn(values)
+    
+    def eval_mask(self, pos_mask: int, neg_mask: Optional[int] = None) -> bool:
+        """
+        Evaluate against a model given as true/false variable bit sets.
+        
+        Args:
+            pos_mask: Bit v set if variable v is True
+            neg_mask: Bit v set if variable v is False; if omitted, every
+                variable not in pos_mask is False
+            
+        Returns:
+            Boolean result
+            
+        Raises:
+            ValueError: If a variable read by the expression is in neither set
+        """
+        if neg_mask is None:
+            return bool(self.eval_bits(self._var_mask, pos_mask))
+        return bool(self.eval_bits(pos_mask | neg_mask, pos_mask))
     
-    def _eval(self, t: str, model: Dict[int, bool]) -> bool:
-        t = t.strip()
+    def eval_batch(self, models: List[Dict[int, bool]]) -> List[bool]:
+        """
+        Evaluate against many models at once.
+        
+        Each variable's values across the batch are packed into one int,
+        one model per bit, and the expression runs once over those ints.
+        That is one big-int operation per node instead of one evaluation
+        per model.
         
-        # Literal: positive or negative integer
-        if re.fullmatch(r"-?\d+", t):
-            v = int(t)
-            val = model.get(abs(v), None)
+        Args:
+            models: List of dictionaries mapping variables to booleans
+            
+        Returns:
+            One boolean per model, in order
+            
+        Raises:
+            ValueError: If a variable read by the expression is undefined
+                in some model
+        """
+        if not models:
+            return []
+        if self._lanes_fn is None:
+            self._lanes_fn = self._build("lambda c, o: ", self._EMIT_LANES)
+        if self._lanes_fn is False:
+            # Too deep to compile: evaluate model by model
+            return [bool(self.eval(model)) for model in models]
+        
+        columns = {}
+        rows = models[::-1]
+        for v in self._var_order:
+            try:
+                bits = "".join(["1" if m[v] else "0" for m in rows])
+            except KeyError:
+                raise ValueError(f"Undefined variable {v} in model")
+            columns[v] = int(bits, 2)
+        return self._run_lanes(columns, len(models))
+    
+    def eval_matrix(self, rows: List[List[bool]], var_to_col: Dict[int, int]) -> List[bool]:
+        """
+        Evaluate against a model matrix, one model per row.
+        
+        Same bit-lane evaluation as eval_batch, but each variable's column
+        is read by index instead of through one dict lookup per model.
+        
+        Args:
+            rows: Models as rows of booleans (n_models x n_columns)
+            var_to_col: Column index of each variable
+            
+        Returns:
+            One boolean per row, in order
+            
+        Raises:
+            ValueError: If a variable read by the expression has no column
+        """
+        missing = self.free_vars.difference(var_to_col)
+        if missing:
+            raise ValueError(f"Undefined variable {min(missing)} in model")
+        if not rows:
+            return []
+        if self._lanes_fn is None:
+            self._lanes_fn = self._build("lambda c, o: ", self._EMIT_LANES)
+        if self._lanes_fn is False:
+            # Too deep to compile: evaluate row by row
+            return [
+                bool(self._run({v: row[var_to_col[v]] for v in self.free_vars}))
+                for row in rows
+            ]
+        
+        columns = {}
+        reversed_rows = rows[::-1]
+        for v in self._var_order:
+            col = var_to_col[v]
+            columns[v] = int("".join(["1" if row[col] else "0" for row in reversed_rows]), 2)
+        return self._run_lanes(columns, len(rows))
+    
+    def _run_lanes(self, columns: Dict[int, int], n: int) -> List[bool]:
+        """Run the lane closure over packed columns and unpack n results."""
+        result = self._lanes_fn(columns, (1 << n) - 1)
+        return [bit == "1" for bit in bin(result)[2:].zfill(n)[::-1]]
+    
+    def eval_all(self, variables: List[int]) -> int:
+        """
+        Compute the full truth table over the given variables.
+        
+        Every assignment is one bit lane, so the table is built with one
+        big-int operation per node (see eval_batch).
+        
+        Args:
+            variables: Variables to enumerate; variables[i] is True in row r
+                when bit i of r is set
+            
+        Returns:
+            Int whose bit r is the value of the expression in row r
+            
+        Raises:
+            ValueError: If the expression reads a variable not listed
+        """
+        missing = self.free_vars.difference(variables)
+        if missing:
+            raise ValueError(f"Undefined variable {min(missing)} in model")
+        rows = 1 << len(variables)
+        full = (1 << rows) - 1
+        
+        if self._lanes_fn is None:
+            self._lanes_fn = self._build("lambda c, o: ", self._EMIT_LANES)
+        if self._lanes_fn is False:
+            # Too deep to compile: evaluate row by row
+            table = 0
+            for r in range(rows):
+                model = {v: bool((r >> i) & 1) for i, v in enumerate(variables)}
+                if self._run(model):
+                    table |= 1 << r
+            return table
+        
+        # Column i: runs of 2^i zeros then 2^i ones, repeated over all rows
+        columns = {}
+        for i, v in enumerate(variables):
+            half = 1 << i
+            period = half << 1
+            repeat = full // ((1 << period) - 1)
+            columns[v] = (((1 << half) - 1) << half) * repeat
+        return self._lanes_fn(columns, full)
+    
+    def _build(self, head: str, tpl: Dict[str, str]):
+        """
+        Compile the tree with the given templates.
+        
+        Returns False if the tree is too deep to compile, so callers can
+        cache the failure instead of retrying on every call.
+        """
+        try:
+            return eval(head + self._emit(self.root, tpl), {"__builtins__": {}})
+        except (RecursionError, SyntaxError, MemoryError):
+            return False
+    
+    def _emit(self, node: Tuple, tpl: Dict[str, str]) -> str:
+        """Emit Python source for a node (operands are integers only)."""
+        op = node[0]
+        if op == "LIT":
+            return tpl["NEG" if node[2] else "POS"].format(v=node[1])
+        if op == "CONST":
+            return tpl["TRUE" if node[1] else "FALSE"]
+        if op == "NOT":
+            return tpl["NOT"].format(a=self._emit(node[1], tpl))
+        return tpl[op].format(a=self._emit(node[1], tpl), b=self._emit(node[2], tpl))
+    
+    def eval_shared(self, model: Dict[int, bool], memo: Dict[int, bool],
+                    memo_vars: set, shared: Dict[int, frozenset]) -> bool:
+        """
+        Evaluate, reusing results of subexpressions shared between rules.
+        
+        Args:
+            model: Dictionary mapping variable numbers to boolean values
+            memo: Results of shared nodes, keyed by id(node)
+            memo_vars: Variables read by the entries in memo; the caller
+                clears memo when one of them is reassigned
+            shared: id(node) -> variables read, for nodes worth memoizing
+        """
+        try:
+            return self._eval_memo(self.root, model, memo, memo_vars, shared)
+        except RecursionError:
+            return self._eval_memo_iter(self.root, model, memo, memo_vars, shared)
+    
+    def _eval_memo(self, node: Tuple, model: Dict[int, bool], memo: Dict[int, bool],
+                   memo_vars: set, shared: Dict[int, frozenset]) -> bool:
+        key = id(node)
+        if key in memo:
+            return memo[key]
+        op = node[0]
+        if op == "LIT":
+            val = model.get(node[1], None)
             if val is None:
-                raise ValueError(f"Undefined variable {abs(v)} in model")
-            return val if v > 0 else (not val)
-        
-        # NOT(expr)
-        if t.startswith("NOT(") and t.endswith(")"):
-            return not self._eval(t[4:-1], model)
-        
-        # AND(expr, expr)
-        if t.startswith("AND(") and t.endswith(")"):
-            a, b = self._split_args(t[4:-1])
-            return self._eval(a, model) and self._eval(b, model)
-        
-        # OR(expr, expr)
-        if t.startswith("OR(") and t.endswith(")"):
-            a, b = self._split_args(t[3:-1])
-            return self._eval(a, model) or self._eval(b, model)
-        
-        # XOR(expr, expr)
-        if t.startswith("XOR(") and t.endswith(")"):
-            a, b = self._split_args(t[4:-1])
-            return self._eval(a, model) ^ self._eval(b, model)
-        
-        raise ValueError(f"Invalid expression: {t}")
-    
-    def _split_args(self, s: str) -> Tuple[str, str]:
-        """Split comma-separated arguments respecting parenthesis depth."""
-        depth = 0
-        for i, ch in enumerate(s):
-            if ch == "(":
-                depth += 1
-            elif ch == ")":
-                depth -= 1
-            elif ch == "," and depth == 0:
-                return s[:i].strip(), s[i+1:].strip()
-        raise ValueError(f"Malformed expression arguments: {s}")
+                raise ValueError(f"Undefined variable {node[1]} in model")
+            return (not val) if node[2] else val
+        if op == "CONST":
+            return node[1]
+        if op == "NOT":
+            val = not self._eval_memo(node[1], model, memo, memo_vars, shared)
+        else:
+            a = self._eval_memo(node[1], model, memo, memo_vars, shared)
+            if op == "AND":
+                val = a and self._eval_memo(node[2], model, memo, memo_vars, shared)
+            elif op == "OR":
+                val = a or self._eval_memo(node[2], model, memo, memo_vars, shared)
+            else:
+                val = a ^ self._eval_memo(node[2], model, memo, memo_vars, shared)
+        if key in shared:
+            memo[key] = val
+            memo_vars.update(shared[key])
+        return val
+    
+    def _eval_memo_iter(self, node: Tuple, model: Dict[int, bool], memo: Dict[int, bool],
+                        memo_vars: set, shared: Dict[int, frozenset]) -> bool:
+        """_eval_memo with an explicit stack, for trees too deep to recurse."""
+        vals = []
+        # state 0: first visit; 1: left operand done; 2: both operands done
+        stack = [(node, 0)]
+        while stack:
+            node, state = stack.pop()
+            op = node[0]
+            if state == 0:
+                key = id(node)
+                if key in memo:
+                    vals.append(memo[key])
+                    continue
+                if op == "LIT":
+                    val = model.get(node[1], None)
+                    if val is None:
+                        raise ValueError(f"Undefined variable {node[1]} in model")
+                    vals.append((not val) if node[2] else val)
+                    continue
+                if op == "CONST":
+                    vals.append(node[1])
+                    continue
+                stack.append((node, 1))
+                stack.append((node[1], 0))
+                continue
+            
+            if state == 1:
+                if op == "NOT":
+                    val = not vals.pop()
+                elif (op == "AND" and not vals[-1]) or (op == "OR" and vals[-1]):
+                    val = vals.pop()
+                else:
+                    stack.append((node, 2))
+                    stack.append((node[2], 0))
+                    continue
+            else:
+                b = vals.pop()
+                a = vals.pop()
+                val = (a ^ b) if op == "XOR" else b
+            
+            key = id(node)
+            if key in shared:
+                memo[key] = val
+                memo_vars.update(shared[key])
+            vals.append(val)
+        return vals[0]
+    
+    @staticmethod
+    def _iter_literals(node: Tuple):
+        """Yield every literal node in a tree (iteratively)."""
+        stack = [node]
+        while stack:
+            n = stack.pop()
+            if n[0] == "LIT":
+                yield n
+            elif n[0] != "CONST":
+                stack.extend(n[1:])
+    
+    @staticmethod
+    def _node_vars(node: Tuple) -> frozenset:
+        """Variables read by a node tree."""
+        return frozenset(lit[1] for lit in Expr._iter_literals(node))
+    
+    @staticmethod
+    def _tokenize(t: str):
+        """Yield (kind, value) tokens: LIT (signed int), OP (name), ( , )."""
+        n = len(t)
+        pos = 0
+        while pos < n:
+            ch = t[pos]
+            if ch.isspace():
+                pos += 1
+            elif ch in "(),":
+                yield ch, None
+                pos += 1
+            elif ch == "-" or ch.isdigit():
+                start = pos
+                pos += 1
+                while pos < n and t[pos].isdigit():
+                    pos += 1
+                if t[start:pos] == "-":
+                    raise ValueError(f"Invalid expression: {t}")
+                yield "LIT", int(t[start:pos])
+            elif ch.isalpha():
+                start = pos
+                while pos < n and t[pos].isalpha():
+                    pos += 1
+                yield "OP", t[start:pos]
+            else:
+                raise ValueError(f"Invalid expression: {t}")
+    
+    @staticmethod
+    def _parse(t: str) -> Tuple[Tuple, Tuple]:
+        """
+        Parse expression text into a node tree and its postfix code.
+        
+        Open operators are kept on an explicit stack as [op, arity, args],
+        so nesting depth costs no Python call frames. Code is emitted in
+        the same pass: a literal as soon as it is read, an operator when
+        its ")" closes it (for AND/OR, a skip inserted before the right
+        operand).
+        """
+        stack = []
+        code = []
+        emit = code.append
+        result = None
+        need_operand = True
+        need_open = False
+        
+        for kind, val in Expr._tokenize(t):
+            if need_open:
+                if kind != "(":
+                    raise ValueError(f"Invalid expression: {t}")
+                need_open = False
+                continue
+            
+            if kind == "LIT" or kind == "OP":
+                if not need_operand or (not stack and result is not None):
+                    raise ValueError(f"Invalid expression: {t}")
+                if kind == "OP":
+                    arity = Expr.OPERATORS.get(val)
+                    if arity is None:
+                        raise ValueError(f"Invalid expression: {t}")
+                    stack.append([val, arity, []])
+                    need_open = True
+                    continue
+                node = ("LIT", abs(val), val < 0)
+                emit((_PUSH_NEG, -val) if val < 0 else (_PUSH_VAR, val))
+            
+            elif kind == ",":
+                if need_operand or not stack or len(stack[-1][2]) >= stack[-1][1]:
+                    raise ValueError(f"Malformed expression arguments: {t}")
+                # Where the right operand's code starts
+                stack[-1].append(len(code))
+                need_operand = True
+                continue
+            
+            elif kind == ")":
+                # Closes the innermost operator
+                if need_operand or not stack or len(stack[-1][2]) != stack[-1][1]:
+                    raise ValueError(f"Malformed expression arguments: {t}")
+                frame = stack.pop()
+                op, args = frame[0], frame[2]
+                node = (op, *args)
+                if op in _SKIP_OPCODES:
+                    split = frame[3]
+                    code.insert(split, (_SKIP_OPCODES[op], len(code) - split))
+                else:
+                    emit((_NOT if op == "NOT" else _XOR, None))
+            
+            else:
+                # "(" is only valid right after an operator name
+                raise ValueError(f"Invalid expression: {t}")
+            
+            # Hand the finished node to the enclosing operator
+            if stack:
+                stack[-1][2].append(node)
+            else:
+                result = node
+            need_operand = False
+        
+        if stack or need_open or result is None:
+            raise ValueError(f"Malformed expression arguments: {t}")
+        return result, tuple(code)
     
     def __repr__(self):
         return f"Expr({self.text})"
 
 
+@lru_cache(maxsize=_EXPR_CACHE_SIZE)
+def _compile_text(text: str) -> Tuple[Tuple, Tuple]:
+    """Parse stripped text to (node tree, postfix code), memoized."""
+    return Expr._parse(text)
+
+
+@lru_cache(maxsize=_EXPR_CACHE_SIZE)
+def parse_expr(text: str) -> Expr:
+    """
+    Parse and compile an expression, memoized on its text.
+    
+    The returned Expr is shared between callers and must not be mutated;
+    use fold() to derive specialized copies.
+    """
+    return Expr(text).compile()
+
+
 class STTFBundle:
     """
     STTF Bundle loader and processor.
@@ -102,11 +857,47 @@ class STTFBundle:
         
         self.transform_steps: List[Tuple[int, str, str]] = []
         self.rev_rules: List[Tuple] = []
+        
+        # Typed views of rev_rules, built once by _index_rev_rules()
+        self._rev_map_pairs: List[Tuple[int, int]] = []
+        self._rev_elim_pairs: List[Tuple[int, bool]] = []
+        self._rev_elim_exprs: List[Tuple[int, Expr]] = []
+        self._rev_clause_adds: List[Tuple[int, array]] = []
+        self._order: List[Tuple[int, int]] = []
+        
+        # Expression nodes interned across rules, and the ones reached from
+        # more than one place (id(node) -> variables read)
+        self._node_cache: Dict[Tuple, Tuple] = {}
+        self._shared_nodes: Dict[int, frozenset] = {}
+        self._rev_elim_shared: List[Tuple[int, Expr]] = []
+        
+        # Expressions that repeat variables get their results cached across
+        # lift_model calls, keyed by (rule index, values of free_vars)
+        self._rev_elim_cached: List[Tuple[int, Expr]] = []
+        self._expr_cache: Dict[Tuple, bool] = {}
         self.manifest_data: Dict[str, Any] = {}
         
+        # CNF contents, parsed on first access
+        self._original_clauses: Optional[List[List[int]]] = None
+        self._simplified_clauses: Optional[List[List[int]]] = None
+        
         self._validate_structure()
         self._load()
     
+    @property
+    def original_clauses(self) -> List[List[int]]:
+        """Clauses of original.cnf, parsed on first access."""
+        if self._original_clauses is None:
+            self._original_clauses = _read_dimacs(self.original)
+        return self._original_clauses
+    
+    @property
+    def simplified_clauses(self) -> List[List[int]]:
+        """Clauses of simplified.cnf, parsed on first access."""
+        if self._simplified_clauses is None:
+            self._simplified_clauses = _read_dimacs(self.simplified)
+        return self._simplified_clauses
+    
     def _validate_structure(self):
         """Validate that all required files exist."""
         required = [
@@ -124,27 +915,20 @@ class STTFBundle:
     def _load(self):
         """Load all bundle components."""
         # Load transform log
-        with open(self.transform) as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
-                try:
-                    step, opcode, rest = self._parse_transform_line(line)
-                    self.transform_steps.append((step, opcode, rest))
-                except Exception as e:
-                    raise ValueError(f"Transform log line {line_num}: {e}")
+        for line_num, line in self._read_lines(self.transform):
+            try:
+                step, opcode, rest = self._parse_transform_line(line)
+                self.transform_steps.append((step, opcode, rest))
+            except Exception as e:
+                raise ValueError(f"Transform log line {line_num}: {e}")
         
         # Load reconstruct map
-        with open(self.reconstruct) as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
-                try:
-                    self.rev_rules.append(self._parse_reverse_line(line))
-                except Exception as e:
-                    raise ValueError(f"Reconstruct map line {line_num}: {e}")
+        for line_num, line in self._read_lines(self.reconstruct):
+            try:
+                self.rev_rules.append(self._parse_reverse_line(line))
+            except Exception as e:
+                raise ValueError(f"Reconstruct map line {line_num}: {e}")
+        self._index_rev_rules()
         
         # Load manifest
         with open(self.manifest_file) as f:
@@ -152,130 +936,434 @@ class STTFBundle:
         
         self._validate_manifest()
     
+    def _index_rev_rules(self):
+        """
+        Split rev_rules into one list per rule type plus an ordering list.
+        
+        _order holds (type_id, index) pairs in map order so lift_model can
+        dispatch on small integers. rev_clause_add rules do not affect
+        models and are left out of _order entirely. rev_elim_expr rules are
+        constant-folded against values pinned by earlier rules; ones that
+        fold to a constant are dispatched as rev_elim.
+        """
+        # Variables whose lifted value is already fixed at this point in
+        # the rule order, used to constant-fold later expressions
+        consts: Dict[int, bool] = {}
+        
+        for rule in self.rev_rules:
+            typ = rule[0]
+            if typ == "rev_map":
+                b, a = rule[1], rule[2]
+                if b in consts:
+                    consts[a] = consts[b]
+                else:
+                    consts.pop(a, None)
+                self._order.append((_REV_MAP, len(self._rev_map_pairs)))
+                self._rev_map_pairs.append((b, a))
+            elif typ == "rev_elim":
+                consts[rule[1]] = rule[2]
+                self._order.append((_REV_ELIM, len(self._rev_elim_pairs)))
+                self._rev_elim_pairs.append((rule[1], rule[2]))
+            elif typ == "rev_elim_expr":
+                v, expr = rule[1], rule[2].fold(consts)
+                if expr.is_constant:
+                    # Fully folded: restore it like a rev_elim rule
+                    consts[v] = expr.root[1]
+                    self._order.append((_REV_ELIM, len(self._rev_elim_pairs)))
+                    self._rev_elim_pairs.append((v, expr.root[1]))
+                else:
+                    consts.pop(v, None)
+                    self._order.append((_REV_ELIM_EXPR, len(self._rev_elim_exprs)))
+                    self._rev_elim_exprs.append((v, expr))
+            elif typ == "rev_clause_add":
+                self._rev_clause_adds.append((rule[1], rule[2]))
+        
+        self._share_subexpressions()
+        self._select_cached_exprs()
+    
+    def _select_cached_exprs(self):
+        """
+        Move rev_elim_expr rules that read some variable more than once to
+        the cached dispatch.
+        
+        A cache key costs one model lookup per distinct variable, while an
+        evaluation costs one per literal, so caching only pays off when
+        literals outnumber variables by a wide margin.
+        """
+        exprs = self._rev_elim_exprs
+        self._rev_elim_exprs = []
+        remap = {}
+        for idx, (v, expr) in enumerate(exprs):
+            if expr._lit_count >= 2 * len(expr.free_vars):
+                remap[idx] = (_REV_ELIM_CACHED, len(self._rev_elim_cached))
+                self._rev_elim_cached.append((v, expr))
+            else:
+                remap[idx] = (_REV_ELIM_EXPR, len(self._rev_elim_exprs))
+                self._rev_elim_exprs.append((v, expr))
+        self._order = [
+            remap[idx] if type_id == _REV_ELIM_EXPR else (type_id, idx)
+            for type_id, idx in self._order
+        ]
+    
+    def _share_subexpressions(self):
+        """
+        Intern expression nodes across all rev_elim_expr rules.
+        
+        Identical subtrees become one node object, so a subexpression that
+        several rules share (typical for Tseitin definitions) can be
+        evaluated once per lift_model call. Rules that reach a shared
+        operator node move to the memoizing _REV_ELIM_SHARED dispatch.
+        """
+        if len(self._rev_elim_exprs) < 2:
+            return
+        
+        refs: Dict[int, int] = {}
+        for i, (v, expr) in enumerate(self._rev_elim_exprs):
+            # Exprs may be shared through parse_expr; rebind a copy
+            expr = copy.copy(expr)
+            expr.root = self._intern_node(expr.root, refs)
+            self._rev_elim_exprs[i] = (v, expr)
+        
+        shared_ids = {key for key, count in refs.items() if count > 1}
+        if not shared_ids:
+            return
+        
+        # The cache holds children before their parents, so each node's
+        # variables are the union of its children's, computed in one pass
+        node_vars: Dict[int, frozenset] = {}
+        for node in self._node_cache.values():
+            op = node[0]
+            if op == "LIT":
+                vs = frozenset((node[1],))
+            elif op == "CONST":
+                vs = frozenset()
+            else:
+                vs = node_vars[id(node[1])]
+                if len(node) > 2:
+                    vs = vs | node_vars[id(node[2])]
+            node_vars[id(node)] = vs
+            if id(node) in shared_ids:
+                self._shared_nodes[id(node)] = vs
+        
+        exprs = self._rev_elim_exprs
+        self._rev_elim_exprs = []
+        remap = {}
+        for idx, (v, expr) in enumerate(exprs):
+            if self._reaches_shared(expr.root):
+                remap[idx] = (_REV_ELIM_SHARED, len(self._rev_elim_shared))
+                self._rev_elim_shared.append((v, expr))
+            else:
+                remap[idx] = (_REV_ELIM_EXPR, len(self._rev_elim_exprs))
+                self._rev_elim_exprs.append((v, expr))
+        self._order = [
+            remap[idx] if type_id == _REV_ELIM_EXPR else (type_id, idx)
+            for type_id, idx in self._order
+        ]
+    
+    def _intern_node(self, node: Tuple, refs: Dict[int, int]) -> Tuple:
+        """Return the canonical copy of node, counting operator references."""
+        cache = self._node_cache
+        results = []
+        stack = [(node, False)]
+        while stack:
+            node, expanded = stack.pop()
+            op = node[0]
+            if op == "LIT" or op == "CONST":
+                results.append(cache.setdefault(node, node))
+                continue
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node[1:]))
+                continue
+            
+            # Children are canonical, so their ids identify them
+            arity = len(node) - 1
+            children = tuple(results[-arity:])
+            del results[-arity:]
+            key = (op,) + tuple(map(id, children))
+            canon = cache.get(key)
+            if canon is None:
+                canon = cache[key] = (op,) + children
+            refs[id(canon)] = refs.get(id(canon), 0) + 1
+            results.append(canon)
+        return results[0]
+    
+    def _reaches_shared(self, node: Tuple) -> bool:
+        """True if any operator node under node is shared."""
+        stack = [node]
+        while stack:
+            n = stack.pop()
+            if id(n) in self._shared_nodes:
+                return True
+            if n[0] != "LIT" and n[0] != "CONST":
+                stack.extend(n[1:])
+        return False
+    
+    @staticmethod
+    def _read_lines(path: Path):
+        """
+        Yield (line_num, line) for each non-blank, non-comment line.
+        
+        The file is read in one call and split as bytes; blank and comment
+        lines are skipped before any decoding happens.
+        """
+        for line_num, bline in enumerate(path.read_bytes().splitlines(), 1):
+            bline = bline.strip()
+            if not bline or bline.startswith(b"#"):
+                continue
+            yield line_num, bline.decode("utf-8")
+    
     def _validate_manifest(self):
         """Validate manifest structure and content."""
-        required_keys = ["version", "generator", "original", "simplified"]
-        for key in required_keys:
+        for key in _MANIFEST_KEYS:
             if key not in self.manifest_data:
                 raise ValueError(f"Manifest missing required key: {key}")
         
         # Validate metadata
-        orig = self.manifest_data["original"]
-        simp = self.manifest_data["simplified"]
-        
-        if not all(k in orig for k in ["variables", "clauses"]):
-            raise ValueError("Manifest original metadata incomplete")
-        
-        if not all(k in simp for k in ["variables", "clauses"]):
-            raise ValueError("Manifest simplified metadata incomplete")
-        
-        if orig["variables"] <= 0 or orig["clauses"] <= 0:
-            raise ValueError("Invalid original CNF metadata")
-        
-        if simp["variables"] <= 0 or simp["clauses"] <= 0:
-            raise ValueError("Invalid simplified CNF metadata")
+        for name in ("original", "simplified"):
+            meta = self.manifest_data[name]
+            if not ("variables" in meta and "clauses" in meta):
+                raise ValueError(f"Manifest {name} metadata incomplete")
+            if min(meta["variables"], meta["clauses"]) <= 0:
+                raise ValueError(f"Invalid {name} CNF metadata")
     
     def _parse_transform_line(self, line: str) -> Tuple[int, str, str]:
         """Parse a transformation log line: <step> <opcode> <args>"""
-        m = re.match(r"(\d+)\s+(\w+)\s+(.*)", line)
-        if not m:
+        # str.split scans the tokens in C; no regex needed for this grammar
+        parts = line.split(None, 2)
+        if len(parts) != 3 or not parts[0].isdigit():
             raise ValueError(f"Invalid transform line format: {line}")
         
-        step = int(m.group(1))
-        opcode = m.group(2)
-        args = m.group(3)
+        step = int(parts[0])
+        opcode = parts[1]
+        args = parts[2]
         
         # Validate opcode
-        valid_opcodes = {
-            "var_rename", "var_elim", "var_subst",
-            "clause_remove", "clause_add", "clause_strengthen",
-            "unit_derive"
-        }
-        
-        if opcode not in valid_opcodes:
+        if opcode not in _VALID_OPCODES:
             raise ValueError(f"Invalid opcode: {opcode}")
         
-        return step, opcode, args
+        # Interned so every step shares one string object per opcode
+        return step, sys.intern(opcode), args
     
     def _parse_reverse_line(self, line: str) -> Tuple:
         """Parse a reconstruction rule line."""
         # rev_map bvar -> avar
         if line.startswith("rev_map"):
-            m = re.match(r"rev_map\s+(\d+)\s*->\s*(\d+)", line)
+            m = _RE_REV_MAP.match(line)
             if not m:
                 raise ValueError(f"Invalid rev_map format: {line}")
             return ("rev_map", int(m.group(1)), int(m.group(2)))
         
         # rev_elim v = value
         if line.startswith("rev_elim "):
-            m = re.match(r"rev_elim\s+(\d+)\s*=\s*(true|false)", line)
+            m = _RE_REV_ELIM.match(line)
             if not m:
                 raise ValueError(f"Invalid rev_elim format: {line}")
             return ("rev_elim", int(m.group(1)), m.group(2) == "true")
         
         # rev_elim_expr v = expr
         if line.startswith("rev_elim_expr"):
-            m = re.match(r"rev_elim_expr\s+(\d+)\s*=\s*(.*)", line)
+            m = _RE_REV_ELIM_EXPR.match(line)
             if not m:
                 raise ValueError(f"Invalid rev_elim_expr format: {line}")
-            return ("rev_elim_expr", int(m.group(1)), Expr(m.group(2)))
+            return ("rev_elim_expr", int(m.group(1)), parse_expr(m.group(2)))
         
         # rev_clause_add id [literals]
         if line.startswith("rev_clause_add"):
-            m = re.match(r"rev_clause_add\s+(\d+)\s+(\[.*\])", line)
+            m = _RE_REV_CLAUSE_ADD.match(line)
             if not m:
                 raise ValueError(f"Invalid rev_clause_add format: {line}")
-            lits = [int(x) for x in re.findall(r"-?\d+", m.group(2))]
+            # Packed as C ints: 4 bytes per literal instead of a boxed int each
+            lits = array("i", map(int, _RE_INT_LIST.findall(m.group(2))))
             return ("rev_clause_add", int(m.group(1)), lits)
         
         raise ValueError(f"Invalid reconstruct rule: {line}")
     
-    def lift_model(self, model_B: Dict[int, bool]) -> Dict[int, bool]:
+    def lift_model(self, model_B: Dict[int, bool],
+                   as_view: bool = False) -> Dict[int, bool]:
         """
         Lift a model from simplified CNF (B) to original CNF (A).
         
         Args:
             model_B: SAT model for simplified.cnf {variable: boolean}
+            as_view: Return a ChainMap of {restored values} over model_B
+                instead of copying model_B; memory is O(reverse rules)
             
         Returns:
             SAT model for original.cnf {variable: boolean}
             
         The reverse mapping rules are applied in order to reconstruct
-        eliminated/substituted variables.
+        eliminated/substituted variables. model_B is never modified.
         """
-        model_A = model_B.copy()
+        if as_view:
+            # Writes land in the overlay; reads fall through to model_B
+            model_A = ChainMap({}, model_B)
+        else:
+            model_A = model_B.copy()
+        
+        rev_map_pairs = self._rev_map_pairs
+        rev_elim_pairs = self._rev_elim_pairs
+        rev_elim_exprs = self._rev_elim_exprs
+        rev_elim_cached = self._rev_elim_cached
+        cache = self._expr_cache
+        
+        # Shared-subexpression results for this call, and the variables they
+        # depend on; any write to one of those variables invalidates them
+        shared = self._shared_nodes
+        memo: Dict[int, bool] = {}
+        memo_vars: set = set()
         
         # Apply reverse mappings in order
-        for rule in self.rev_rules:
-            typ = rule[0]
-            
-            if typ == "rev_map":
+        for type_id, idx in self._order:
+            if type_id == _REV_MAP:
                 # Variable renaming: map B variable to A variable
-                b, a = rule[1], rule[2]
-                if b in model_A:
-                    model_A[a] = model_A[b]
+                b, v = rev_map_pairs[idx]
+                if b not in model_A:
+                    continue
+                model_A[v] = model_A[b]
             
-            elif typ == "rev_elim":
+            elif type_id == _REV_ELIM:
                 # Constant elimination: restore fixed value
-                v, val = rule[1], rule[2]
+                v, val = rev_elim_pairs[idx]
                 model_A[v] = val
             
-            elif typ == "rev_elim_expr":
+            elif type_id == _REV_ELIM_EXPR:
                 # Expression substitution: evaluate to restore value
-                v, expr = rule[1], rule[2]
+                v, expr = rev_elim_exprs[idx]
                 model_A[v] = expr.eval(model_A)
             
-            elif typ == "rev_clause_add":
-                # Clause added during transformation (no model impact)
-                pass
+            elif type_id == _REV_ELIM_CACHED:
+                # Expression whose result is cached across calls
+                v, expr = rev_elim_cached[idx]
+                try:
+                    key = (idx,) + tuple(map(model_A.__getitem__, expr._var_order))
+                except KeyError:
+                    # Partial model: evaluation may short-circuit past the
+                    # missing variable, so evaluate without caching
+                    model_A[v] = expr.eval(model_A)
+                else:
+                    val = cache.get(key)
+                    if val is None:
+                        val = expr.eval(model_A)
+                        if len(cache) >= _EXPR_CACHE_SIZE:
+                            # Evict the oldest entry (dicts keep insertion order)
+                            del cache[next(iter(cache))]
+                        cache[key] = val
+                    model_A[v] = val
+            
+            else:
+                # Expression with subexpressions shared across rules
+                v, expr = self._rev_elim_shared[idx]
+                model_A[v] = expr.eval_shared(model_A, memo, memo_vars, shared)
+            
+            if v in memo_vars:
+                memo.clear()
+                memo_vars.clear()
         
         return model_A
     
+    def lift_model_bits(self, mask: int, values: int) -> Tuple[int, int]:
+        """
+        Lift a bit-packed model from simplified CNF (B) to original CNF (A).
+        
+        Args:
+            mask: Bit v set if variable v is assigned in model B
+            values: Bit v set if variable v is True in model B
+            
+        Returns:
+            (mask, values) for the model of original.cnf
+            
+        Same rules and order as lift_model(); see pack_model() and
+        unpack_model() to convert from and to dict models.
+        """
+        exprs = {
+            _REV_ELIM_EXPR: self._rev_elim_exprs,
+            _REV_ELIM_SHARED: self._rev_elim_shared,
+            _REV_ELIM_CACHED: self._rev_elim_cached,
+        }
+        
+        for type_id, idx in self._order:
+            if type_id == _REV_MAP:
+                b, v = self._rev_map_pairs[idx]
+                if not (mask >> b) & 1:
+                    continue
+                bit = (values >> b) & 1
+            elif type_id == _REV_ELIM:
+                v, val = self._rev_elim_pairs[idx]
+                bit = 1 if val else 0
+            else:
+                v, expr = exprs[type_id][idx]
+                if mask & expr._var_mask == expr._var_mask:
+                    bit = expr.eval_bits(mask, values)
+                else:
+                    # Partial model: eval short-circuits past variables it
+                    # does not need, and raises for ones it does
+                    model = {u: bool((values >> u) & 1)
+                             for u in expr.free_vars if (mask >> u) & 1}
+                    bit = int(expr.eval(model))
+            
+            mask |= 1 << v
+            if bit:
+                values |= 1 << v
+            else:
+                values &= ~(1 << v)
+        
+        return mask, values
+    
+    def lift_model_batch(self, models_B: List[Dict[int, bool]]) -> List[Dict[int, bool]]:
+        """
+        Lift many models from simplified CNF (B) to original CNF (A).
+        
+        Equivalent to [lift_model(m) for m in models_B], but expression
+        rules that read their variables many times are evaluated once for
+        the whole batch with Expr.eval_batch() when every model assigns
+        all of the rule's variables.
+        
+        Args:
+            models_B: List of SAT models for simplified.cnf
+            
+        Returns:
+            List of SAT models for original.cnf, in the same order
+        """
+        models_A = [model.copy() for model in models_B]
+        exprs = {
+            _REV_ELIM_EXPR: self._rev_elim_exprs,
+            _REV_ELIM_SHARED: self._rev_elim_shared,
+            _REV_ELIM_CACHED: self._rev_elim_cached,
+        }
+        
+        for type_id, idx in self._order:
+            if type_id == _REV_MAP:
+                b, a = self._rev_map_pairs[idx]
+                for model in models_A:
+                    if b in model:
+                        model[a] = model[b]
+            elif type_id == _REV_ELIM:
+                v, val = self._rev_elim_pairs[idx]
+                for model in models_A:
+                    model[v] = val
+            else:
+                v, expr = exprs[type_id][idx]
+                vals = None
+                if expr._lit_count >= 4 * len(expr.free_vars):
+                    try:
+                        vals = expr.eval_batch(models_A)
+                    except ValueError:
+                        # Some model is partial; fall back to eval, which
+                        # short-circuits past variables it does not need
+                        pass
+                if vals is None:
+                    # Also the path for small expressions: packing columns
+                    # costs about as much as evaluating model by model
+                    vals = [expr.eval(model) for model in models_A]
+                for model, val in zip(models_A, vals):
+                    model[v] = val
+        
+        return models_A
+    
     def get_transform_summary(self) -> Dict[str, Any]:
         """Get summary statistics about the transformation."""
-        opcodes = {}
-        for _, op, _ in self.transform_steps:
-            opcodes[op] = opcodes.get(op, 0) + 1
+        opcodes = dict(Counter(op for _, op, _ in self.transform_steps))
         
         return {
             "total_steps": len(self.transform_steps),
@@ -5,9 +5,31 @@ Utility for creating example STTF bundles for testing and demonstration.
 
 import json
 from pathlib import Path
-from datetime import datetime
+from time import gmtime, strftime
 from typing import List, Tuple, Dict, Any
 
+from sttf_replay import _ClauseFormats
+
+
+# transform.log line layout per opcode: step id first, then the step args
+_STEP_FORMATS = {
+    "var_rename": "{} var_rename {} {}",
+    "var_elim": "{} var_elim {} {}",
+    "var_subst": "{} var_subst {} = {}",
+    "clause_remove": "{} clause_remove {} {}",
+    "clause_add": "{} clause_add [{}] {}",
+    "clause_strengthen": "{} clause_strengthen {} [{}]",
+    "unit_derive": "{} unit_derive {} {}",
+}
+
+
+# reconstruct.map line layout per rule kind
+_REV_FORMATS = {
+    "rev_map": "rev_map {} -> {}",
+    "rev_elim": "rev_elim {} = {}",
+    "rev_elim_expr": "rev_elim_expr {} = {}",
+}
+
 
 class STTFBundleGenerator:
     """Generate valid STTF bundles with transformations."""
@@ -18,8 +40,8 @@ class STTFBundleGenerator:
         
         self.original_vars = 0
         self.original_clauses = []
-        self.transform_steps = []
-        self.rev_rules = []
+        self.transform_steps: List[Tuple[int, str, tuple]] = []
+        self.rev_rules: List[Tuple[str, int, Any]] = []
         self.step_counter = 1
     
     def set_original_cnf(self, num_vars: int, clauses: List[List[int]]):
@@ -27,61 +49,51 @@ class STTFBundleGenerator:
         self.original_vars = num_vars
         self.original_clauses = clauses
     
+    def _add_step(self, opcode: str, *args):
+        """Record a transform step as (step, opcode, args)."""
+        self.transform_steps.append((self.step_counter, opcode, args))
+        self.step_counter += 1
+    
     def add_var_rename(self, old: int, new: int):
         """Add variable renaming transformation."""
-        self.transform_steps.append(
-            f"{self.step_counter} var_rename {old} {new}"
-        )
-        self.rev_rules.append(f"rev_map {new} -> {old}")
-        self.step_counter += 1
+        self._add_step("var_rename", old, new)
+        self.rev_rules.append(("rev_map", new, old))
     
     def add_var_elim(self, var: int, reason: str = "pure_literal"):
         """Add variable elimination transformation."""
-        self.transform_steps.append(
-            f"{self.step_counter} var_elim {var} {reason}"
-        )
+        self._add_step("var_elim", var, reason)
         # Eliminated variable needs reconstruction rule
         # For simplicity, set to false (would be determined by actual elimination)
-        self.rev_rules.append(f"rev_elim {var} = false")
-        self.step_counter += 1
+        self.rev_rules.append(("rev_elim", var, "false"))
     
     def add_var_subst(self, var: int, expr: str):
         """Add variable substitution transformation."""
-        self.transform_steps.append(
-            f"{self.step_counter} var_subst {var} = {expr}"
-        )
-        self.rev_rules.append(f"rev_elim_expr {var} = {expr}")
-        self.step_counter += 1
+        self._add_step("var_subst", var, expr)
+        self.rev_rules.append(("rev_elim_expr", var, expr))
     
     def add_clause_remove(self, clause_id: int, reason: str = "subsumed"):
         """Add clause removal transformation."""
-        self.transform_steps.append(
-            f"{self.step_counter} clause_remove {clause_id} {reason}"
-        )
-        self.step_counter += 1
+        self._add_step("clause_remove", clause_id, reason)
     
     def add_clause_add(self, literals: List[int], source: str = "resolution"):
         """Add clause addition transformation."""
-        lit_str = " ".join(map(str, literals))
-        self.transform_steps.append(
-            f"{self.step_counter} clause_add [{lit_str}] {source}"
-        )
-        self.step_counter += 1
+        self._add_step("clause_add", tuple(literals), source)
     
     def add_clause_strengthen(self, clause_id: int, new_literals: List[int]):
         """Add clause strengthening transformation."""
-        lit_str = " ".join(map(str, new_literals))
-        self.transform_steps.append(
-            f"{self.step_counter} clause_strengthen {clause_id} [{lit_str}]"
-        )
-        self.step_counter += 1
+        self._add_step("clause_strengthen", clause_id, tuple(new_literals))
     
     def add_unit_derive(self, literal: int, source_clause: int):
         """Add unit derivation transformation."""
-        self.transform_steps.append(
-            f"{self.step_counter} unit_derive {literal} {source_clause}"
-        )
-        self.step_counter += 1
+        self._add_step("unit_derive", literal, source_clause)
+    
+    @staticmethod
+    def _format_step(step: Tuple[int, str, tuple]) -> str:
+        """Format a recorded step as a transform.log line."""
+        step_id, opcode, args = step
+        args = [" ".join(map(str, a)) if isinstance(a, tuple) else a
+                for a in args]
+        return _STEP_FORMATS[opcode].format(step_id, *args)
     
     def compute_simplified_cnf(self) -> Tuple[int, List[List[int]]]:
         """
@@ -94,44 +106,38 @@ class STTFBundleGenerator:
         eliminated = set()
         renamed = {}
         
-        for step in self.transform_steps:
-            parts = step.split(maxsplit=2)
-            opcode = parts[1]
-            args = parts[2] if len(parts) > 2 else ""
-            
+        for _, opcode, args in self.transform_steps:
             if opcode == "var_rename":
-                old, new = map(int, args.split())
+                old, new = args
                 renamed[old] = new
                 
-            elif opcode == "var_elim":
-                var = int(args.split()[0])
-                eliminated.add(var)
-                
-            elif opcode == "var_subst":
-                var = int(args.split("=")[0].strip())
-                eliminated.add(var)
+            elif opcode == "var_elim" or opcode == "var_subst":
+                eliminated.add(args[0])
                 
             elif opcode == "clause_remove":
-                cid = int(args.split()[0])
-                if cid in clause_map:
-                    del clause_map[cid]
+                clause_map.pop(args[0], None)
+        
+        # Flatten eliminations and rename chains into one dense lookup
+        # table: lut[v] is the final variable for v, or 0 if v is eliminated
+        max_var = max(
+            max((abs(lit) for clause in clause_map.values() for lit in clause),
+                default=0),
+            self.original_vars
+        )
+        self._compress_renames(renamed)
+        lut = list(range(max_var + 1))
+        for var, target in renamed.items():
+            if var <= max_var:
+                lut[var] = target
+        for var in eliminated:
+            if var <= max_var:
+                lut[var] = 0
         
-        # Apply renames and filter
+        # Remap every clause through the table; 0 marks an eliminated literal
         simplified = []
         for clause in clause_map.values():
-            new_clause = []
-            skip = False
-            for lit in clause:
-                var = abs(lit)
-                if var in eliminated:
-                    skip = True
-                    break
-                # Apply renames
-                while var in renamed:
-                    var = renamed[var]
-                new_lit = var if lit > 0 else -var
-                new_clause.append(new_lit)
-            if not skip and new_clause:
+            new_clause = [lut[lit] if lit > 0 else -lut[-lit] for lit in clause]
+            if new_clause and 0 not in new_clause:
                 simplified.append(new_clause)
         
         # Count active variables
@@ -144,6 +150,39 @@ class STTFBundleGenerator:
         
         return num_vars, simplified
     
+    @staticmethod
+    def _compress_renames(renamed: Dict[int, int]):
+        """
+        Point every renamed variable directly at the end of its chain.
+        
+        Each chain is walked once and all variables on it are rewritten
+        (path compression), so a -> b -> c -> d costs one pass instead of
+        one walk per variable. Cycles stop at the first repeated variable.
+        """
+        for var in list(renamed):
+            path = []
+            seen = set()
+            target = var
+            while target in renamed and target not in seen:
+                seen.add(target)
+                path.append(target)
+                target = renamed[target]
+            for p in path:
+                renamed[p] = target
+    
+    @staticmethod
+    def _dimacs_lines(num_vars: int, clauses: List[List[int]]) -> List[str]:
+        """Format a CNF formula as DIMACS lines (header first)."""
+        fmts = _ClauseFormats()
+        lines = [f"p cnf {num_vars} {len(clauses)}"]
+        lines.extend(fmts[len(clause)] % tuple(clause) for clause in clauses)
+        return lines
+    
+    def _write_lines(self, name: str, lines: List[str]):
+        """Write lines to a bundle file as one pre-encoded bytes buffer."""
+        data = ("\n".join(lines) + "\n").encode("utf-8") if lines else b""
+        (self.output_dir / name).write_bytes(data)
+    
     def write_bundle(self, generator_name: str = "sttf_generator", 
                     generator_version: str = "1.0"):
         """Write complete STTF bundle to disk."""
@@ -152,26 +191,20 @@ class STTFBundleGenerator:
         simp_vars, simp_clauses = self.compute_simplified_cnf()
         
         # Write original.cnf
-        with open(self.output_dir / "original.cnf", "w") as f:
-            f.write(f"p cnf {self.original_vars} {len(self.original_clauses)}\n")
-            for clause in self.original_clauses:
-                f.write(" ".join(map(str, clause)) + " 0\n")
+        self._write_lines("original.cnf", self._dimacs_lines(
+            self.original_vars, self.original_clauses))
         
         # Write simplified.cnf
-        with open(self.output_dir / "simplified.cnf", "w") as f:
-            f.write(f"p cnf {simp_vars} {len(simp_clauses)}\n")
-            for clause in simp_clauses:
-                f.write(" ".join(map(str, clause)) + " 0\n")
+        self._write_lines("simplified.cnf", self._dimacs_lines(
+            simp_vars, simp_clauses))
         
         # Write transform.log
-        with open(self.output_dir / "transform.log", "w") as f:
-            for step in self.transform_steps:
-                f.write(step + "\n")
+        self._write_lines("transform.log",
+                          [self._format_step(step) for step in self.transform_steps])
         
         # Write reconstruct.map
-        with open(self.output_dir / "reconstruct.map", "w") as f:
-            for rule in self.rev_rules:
-                f.write(rule + "\n")
+        self._write_lines("reconstruct.map", [
+            _REV_FORMATS[kind].format(a, b) for kind, a, b in self.rev_rules])
         
         # Write manifest.json
         manifest = {
@@ -180,7 +213,7 @@ class STTFBundleGenerator:
                 "tool": generator_name,
                 "version": generator_version
             },
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": strftime("%Y-%m-%dT%H:%M:%SZ", gmtime()),
             "original": {
                 "variables": self.original_vars,
                 "clauses": len(self.original_clauses)
@@ -192,8 +225,9 @@ class STTFBundleGenerator:
             "transformation_steps": len(self.transform_steps)
         }
         
-        with open(self.output_dir / "manifest.json", "w") as f:
-            json.dump(manifest, f, indent=2)
+        # json.dump with indent streams many tiny writes; serialize once
+        (self.output_dir / "manifest.json").write_bytes(
+            json.dumps(manifest, indent=2).encode("utf-8"))
         
         print(f"✓ STTF bundle written to {self.output_dir}")
         print(f"  Original: {self.original_vars} vars, {len(self.original_clauses)} clauses")
@@ -3,58 +3,198 @@ STTF Replay Engine
 Deterministically replays transformations to reconstruct simplified CNF from original CNF.
 """
 
-from typing import Dict, List, Set, Tuple, Optional
+from typing import Any, Dict, Iterable, List, Set, TextIO, Tuple, Optional
+from array import array
+from collections import defaultdict
+from itertools import chain, islice
 from pathlib import Path
+import hashlib
+import io
 import re
 
 
+# Transform log patterns, compiled once
+_RE_SUBST = re.compile(r"(\d+)\s*=\s*(.*)")
+_RE_CLAUSE = re.compile(r"\[([^\]]*)\]")
+
+# Integer ids for transform opcodes in a parsed step stream
+(_OP_VAR_RENAME, _OP_VAR_ELIM, _OP_VAR_SUBST, _OP_CLAUSE_REMOVE,
+ _OP_CLAUSE_ADD, _OP_CLAUSE_STRENGTHEN, _OP_UNIT_DERIVE) = range(7)
+
+# Clauses formatted per write call in CNFFormula.write_dimacs
+_DIMACS_BLOCK = 4096
+
+# Parsed step streams keyed by a digest of the log's bytes, so a log
+# rewritten in place (same size and mtime) is never served stale
+_STEP_CACHE: Dict[bytes, Tuple] = {}
+
+# Maximum number of step streams kept in _STEP_CACHE
+_STEP_CACHE_SIZE = 8
+
+
+class _ClauseFormats(dict):
+    """
+    DIMACS clause format strings by clause length, built on first use.
+    
+    "%d %d %d 0" % (1, -2, 3) formats a whole clause in one C-level call,
+    which beats " ".join(map(str, clause)) + " 0" by avoiding the
+    intermediate str per literal. end is appended after the literals.
+    """
+    
+    def __init__(self, end: str = "0"):
+        super().__init__()
+        self.end = end
+    
+    def __missing__(self, n: int) -> str:
+        fmt = self[n] = "%d " * n + self.end
+        return fmt
+
+
 class CNFFormula:
     """In-memory representation of a CNF formula."""
     
     def __init__(self):
         self.num_vars: int = 0
-        self.clauses: List[List[int]] = []
-        self.clause_ids: Dict[int, List[int]] = {}  # clause_id -> clause
+        # clause_id -> clause as array('i'); dict order is insertion order
+        self.clause_ids: Dict[int, array] = {}
+        # var -> ids of clauses containing it (either polarity)
+        self.occ: Dict[int, Set[int]] = defaultdict(set)
+        # Largest variable in occ; recomputed lazily once marked dirty
+        self._max_var: int = 0
+        self._max_var_dirty: bool = False
         self.next_clause_id: int = 1
         self.var_mapping: Dict[int, int] = {}  # old -> new for renames
         self.eliminated_vars: Set[int] = set()
         self.substitutions: Dict[int, str] = {}  # var -> expression
     
-    def add_clause(self, literals: List[int], clause_id: Optional[int] = None) -> int:
-        """Add a clause and return its ID."""
+    def add_clause(self, literals: Iterable[int], clause_id: Optional[int] = None) -> int:
+        """
+        Add a clause and return its ID.
+        
+        Repeated literals are dropped (first occurrence kept). A
+        tautological clause (x and -x) is stored like any other, so every
+        consumed ID names a clause that later steps can strengthen, and
+        clause counts match the log. Literals are copied into a
+        4-byte-per-literal array('i'), which rename_var and
+        strengthen_clause then update in place.
+        """
         if clause_id is None:
             clause_id = self.next_clause_id
-            self.next_clause_id += 1
+        # Never hand out an ID that is already taken
+        if clause_id >= self.next_clause_id:
+            self.next_clause_id = clause_id + 1
         
-        self.clauses.append(literals)
+        self.remove_clause(clause_id)
+        literals = array("i", dict.fromkeys(literals))
         self.clause_ids[clause_id] = literals
+        self._add_occ(clause_id, literals)
         return clause_id
     
+    def add_clauses(self, clauses: Iterable[Iterable[int]], first_id: int):
+        """
+        Bulk form of add_clause for consecutive IDs starting at first_id.
+        
+        Drops repeated literals the same way, but links the occurrence
+        lists in one loop and settles the largest variable once at the end.
+        """
+        clause_ids = self.clause_ids
+        occ = self.occ
+        clause_id = first_id
+        for literals in clauses:
+            if clause_id in clause_ids:
+                self.remove_clause(clause_id)
+            clause = clause_ids[clause_id] = array("i", dict.fromkeys(literals))
+            for var in set(map(abs, clause)):
+                occ[var].add(clause_id)
+            clause_id += 1
+        
+        if clause_id > self.next_clause_id:
+            self.next_clause_id = clause_id
+        self._max_var = max(occ, default=0)
+        self._max_var_dirty = False
+    
+    @property
+    def clauses(self) -> "_ClauseView":
+        """Live view of the clauses in insertion order, yielded as lists."""
+        return _ClauseView(self)
+    
     def remove_clause(self, clause_id: int):
         """Remove a clause by ID."""
-        if clause_id in self.clause_ids:
-            clause = self.clause_ids[clause_id]
-            if clause in self.clauses:
-                self.clauses.remove(clause)
-            del self.clause_ids[clause_id]
+        clause = self.clause_ids.pop(clause_id, None)
+        if clause is not None:
+            self._drop_occ(clause_id, clause)
+    
+    def _add_occ(self, clause_id: int, literals: array):
+        """Link a clause into the occurrence lists of its variables."""
+        occ = self.occ
+        for lit in literals:
+            occ[abs(lit)].add(clause_id)
+        if literals:
+            top = max(max(literals), -min(literals))
+            if top > self._max_var:
+                self._max_var = top
+    
+    def _drop_occ(self, clause_id: int, literals: Iterable[int]):
+        """Unlink a clause from the occurrence lists of its variables."""
+        occ = self.occ
+        for lit in literals:
+            var = abs(lit)
+            ids = occ.get(var)
+            if ids is not None:
+                ids.discard(clause_id)
+                if not ids:
+                    del occ[var]
+                    if var == self._max_var:
+                        self._max_var_dirty = True
+    
+    def max_active_var(self) -> int:
+        """Largest variable appearing in current clauses (0 if none)."""
+        if self._max_var_dirty:
+            self._max_var = max(self.occ, default=0)
+            self._max_var_dirty = False
+        return self._max_var
+    
+    def remove_clauses_with_var(self, var: int):
+        """Remove every clause containing var, in one pass over occ[var]."""
+        ids = self.occ.pop(var, None)
+        if not ids:
+            return
+        if var == self._max_var:
+            self._max_var_dirty = True
+        clause_ids = self.clause_ids
+        for cid in ids:
+            self._drop_occ(cid, clause_ids.pop(cid))
+    
+    def clauses_with_var(self, var: int) -> List[int]:
+        """IDs of clauses containing var, as a snapshot safe to mutate over."""
+        return list(self.occ.get(var, ()))
     
     def rename_var(self, old: int, new: int):
         """Rename variable throughout formula."""
         self.var_mapping[old] = new
         
-        # Update all clauses - preserve sign of literal
-        for i, clause in enumerate(self.clauses):
-            self.clauses[i] = [
-                (new if lit > 0 else -new) if abs(lit) == old else lit 
-                for lit in clause
-            ]
+        moved = self.occ.pop(old, None)
+        if not moved:
+            return
+        if old == self._max_var:
+            self._max_var_dirty = True
+        if new > self._max_var:
+            self._max_var = new
         
-        # Update clause_ids mapping
-        for cid, clause in self.clause_ids.items():
-            self.clause_ids[cid] = [
-                (new if lit > 0 else -new) if abs(lit) == old else lit 
-                for lit in clause
-            ]
+        # Update only clauses mentioning old, in place - preserve sign of literal
+        # (two equality tests against precomputed literals, no abs())
+        clause_ids = self.clause_ids
+        neg_old, neg_new = -old, -new
+        for cid in moved:
+            clause = clause_ids[cid]
+            for i, lit in enumerate(clause):
+                if lit == old:
+                    clause[i] = new
+                elif lit == neg_old:
+                    clause[i] = neg_new
+        
+        # Occurrences of old now belong to new
+        self.occ[new] |= moved
     
     def eliminate_var(self, var: int):
         """Mark variable as eliminated."""
@@ -67,12 +207,12 @@ class CNFFormula:
     
     def strengthen_clause(self, clause_id: int, new_literals: List[int]):
         """Replace clause with strengthened version."""
-        if clause_id in self.clause_ids:
-            old_clause = self.clause_ids[clause_id]
-            if old_clause in self.clauses:
-                idx = self.clauses.index(old_clause)
-                self.clauses[idx] = new_literals
-            self.clause_ids[clause_id] = new_literals
+        old_clause = self.clause_ids.get(clause_id)
+        if old_clause is not None:
+            self._drop_occ(clause_id, old_clause)
+            # Reuse the stored array so the clause keeps its identity
+            old_clause[:] = array("i", new_literals)
+            self._add_occ(clause_id, old_clause)
     
     def add_unit(self, literal: int):
         """Add unit clause."""
@@ -80,23 +220,82 @@ class CNFFormula:
     
     def get_active_vars(self) -> Set[int]:
         """Get set of variables appearing in current clauses."""
-        active = set()
-        for clause in self.clauses:
-            for lit in clause:
-                active.add(abs(lit))
-        return active
+        # occ only keeps variables with at least one live occurrence
+        return set(self.occ)
     
     def to_dimacs(self) -> str:
         """Export to DIMACS CNF format."""
-        active_vars = self.get_active_vars()
-        num_vars = max(active_vars) if active_vars else 0
-        num_clauses = len(self.clauses)
+        buf = io.StringIO()
+        self.write_dimacs(buf)
+        return buf.getvalue()
+    
+    def write_dimacs(self, fp: TextIO):
+        """Stream the formula in DIMACS CNF format to a text file object."""
+        num_vars = self.max_active_var()
+        num_clauses = len(self.clause_ids)
+        fp.write(f"p cnf {num_vars} {num_clauses}\n")
         
-        lines = [f"p cnf {num_vars} {num_clauses}"]
-        for clause in self.clauses:
-            lines.append(" ".join(map(str, clause)) + " 0")
+        # One "%d ... 0" line format per clause length, built on first use
+        formats = _ClauseFormats("0\n")
         
-        return "\n".join(lines) + "\n"
+        # Format a block of clauses with a single % call over all of their
+        # literals, so peak memory stays at one block rather than the file
+        clauses = iter(self.clause_ids.values())
+        while True:
+            block = list(islice(clauses, _DIMACS_BLOCK))
+            if not block:
+                break
+            fmt = "".join(map(formats.__getitem__, map(len, block)))
+            fp.write(fmt % tuple(chain.from_iterable(block)))
+
+
+class _ClauseView:
+    """
+    Read-only view over CNFFormula clauses.
+    
+    len() is O(1) and membership only compares clauses that share the
+    first literal's variable, found through the occurrence lists.
+    Indexing and slicing walk the clauses in order and return copies.
+    """
+    
+    def __init__(self, formula: CNFFormula):
+        self._formula = formula
+    
+    def __len__(self) -> int:
+        return len(self._formula.clause_ids)
+    
+    def __iter__(self):
+        for clause in self._formula.clause_ids.values():
+            yield list(clause)
+    
+    def __getitem__(self, index):
+        clauses = self._formula.clause_ids.values()
+        if isinstance(index, slice):
+            return [list(clause) for clause in list(clauses)[index]]
+        n = len(clauses)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("clause index out of range")
+        return list(next(islice(clauses, index, None)))
+    
+    def __contains__(self, literals) -> bool:
+        target = array("i", literals)
+        clause_ids = self._formula.clause_ids
+        if not target:
+            return any(not clause for clause in clause_ids.values())
+        for cid in self._formula.occ.get(abs(target[0]), ()):
+            if clause_ids[cid] == target:
+                return True
+        return False
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, _ClauseView):
+            other = list(other)
+        return list(self) == other
+    
+    def __repr__(self) -> str:
+        return repr(list(self))
 
 
 class STTFReplayEngine:
@@ -108,27 +307,60 @@ class STTFReplayEngine:
         self.original_path = Path(original_cnf_path)
         self.transform_path = Path(transform_log_path)
         self.formula = CNFFormula()
+        # opcode -> (op id, argument parser)
+        self._dispatch = {
+            "var_rename": (_OP_VAR_RENAME, self._parse_var_rename),
+            "var_elim": (_OP_VAR_ELIM, self._parse_var_elim),
+            "var_subst": (_OP_VAR_SUBST, self._parse_var_subst),
+            "clause_remove": (_OP_CLAUSE_REMOVE, self._parse_clause_remove),
+            "clause_add": (_OP_CLAUSE_ADD, self._parse_clause_add),
+            "clause_strengthen": (_OP_CLAUSE_STRENGTHEN, self._parse_clause_strengthen),
+            "unit_derive": (_OP_UNIT_DERIVE, self._parse_unit_derive),
+        }
         
     def load_original(self):
         """Load original CNF from DIMACS file."""
-        with open(self.original_path) as f:
-            clause_id = 1
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith("c"):
-                    continue
-                
-                if line.startswith("p"):
-                    # Parse header: p cnf <vars> <clauses>
-                    parts = line.split()
-                    self.formula.num_vars = int(parts[2])
-                    continue
-                
-                # Parse clause
-                literals = [int(x) for x in line.split() if x != "0"]
-                if literals:
-                    self.formula.add_clause(literals, clause_id)
-                    clause_id += 1
+        data = self.original_path.read_bytes()
+        
+        # Comments and the header precede the clauses; scan only those lines
+        start = 0
+        size = len(data)
+        while start < size:
+            end = data.find(b"\n", start)
+            if end < 0:
+                end = size
+            line = data[start:end]
+            head = line.lstrip()[:1]
+            if head == b"p":
+                # Parse header: p cnf <vars> <clauses>
+                self.formula.num_vars = int(line.split()[2])
+            elif head and head != b"c":
+                break
+            start = end + 1
+        body = data[start:] if start else data
+        
+        # Clause lines are only digits, signs and whitespace; filter lines
+        # only if a comment or header turns up among them
+        if b"c" in body or b"p" in body:
+            body = b" ".join(
+                line for line in body.splitlines()
+                if line.lstrip()[:1] not in (b"c", b"p")
+            )
+        lits = list(map(int, body.split()))
+        
+        # Cut the literal stream into clauses at each 0 terminator
+        def clauses():
+            start = 0
+            while start < len(lits):
+                try:
+                    end = lits.index(0, start)
+                except ValueError:
+                    end = len(lits)
+                if end > start:
+                    yield lits[start:end]
+                start = end + 1
+        
+        self.formula.add_clauses(clauses(), 1)
     
     def replay_transformation(self) -> CNFFormula:
         """
@@ -138,132 +370,143 @@ class STTFReplayEngine:
             CNFFormula representing the simplified CNF
         """
         self.load_original()
-        
-        with open(self.transform_path) as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
-                
-                try:
-                    self._apply_transform_step(line)
-                except Exception as e:
-                    raise ValueError(f"Transform line {line_num}: {e}")
-        
+        apply_steps(self.formula, self.parse_steps())
         return self.formula
     
-    def _apply_transform_step(self, line: str):
-        """Apply a single transformation step."""
-        # Parse: <step> <opcode> <args>
-        m = re.match(r"(\d+)\s+(\w+)\s+(.*)", line)
-        if not m:
-            raise ValueError(f"Invalid transform line: {line}")
+    def parse_steps(self) -> Tuple[Tuple[int, int, Any, Any], ...]:
+        """
+        Parse the transform log into a step stream.
         
-        step = int(m.group(1))
-        opcode = m.group(2)
-        args = m.group(3)
+        The stream is cached by log content, so replaying an unchanged
+        log again skips parsing; the file itself is still read each time.
         
-        # Dispatch to handler
-        if opcode == "var_rename":
-            self._handle_var_rename(args)
-        elif opcode == "var_elim":
-            self._handle_var_elim(args)
-        elif opcode == "var_subst":
-            self._handle_var_subst(args)
-        elif opcode == "clause_remove":
-            self._handle_clause_remove(args)
-        elif opcode == "clause_add":
-            self._handle_clause_add(args)
-        elif opcode == "clause_strengthen":
-            self._handle_clause_strengthen(args)
-        elif opcode == "unit_derive":
-            self._handle_unit_derive(args)
-        else:
-            raise ValueError(f"Unknown opcode: {opcode}")
-    
-    def _handle_var_rename(self, args: str):
-        """Handle var_rename old new"""
-        parts = args.split()
-        old, new = int(parts[0]), int(parts[1])
-        self.formula.rename_var(old, new)
-    
-    def _handle_var_elim(self, args: str):
-        """Handle var_elim v reason"""
-        parts = args.split(maxsplit=1)
-        var = int(parts[0])
-        reason = parts[1] if len(parts) > 1 else ""
-        self.formula.eliminate_var(var)
+        Returns:
+            Tuple of (line_num, op_id, a, b) tuples, where a and b are the
+            already-converted operands of the step (None when unused)
+        """
+        data = self.transform_path.read_bytes()
+        key = hashlib.blake2b(data, digest_size=16).digest()
+        cached = _STEP_CACHE.get(key)
+        if cached is not None:
+            return cached
         
-        # Remove clauses containing this variable
-        to_remove = []
-        for cid, clause in self.formula.clause_ids.items():
-            if any(abs(lit) == var for lit in clause):
-                to_remove.append(cid)
+        steps = []
+        append = steps.append
+        dispatch = self._dispatch
+        line_num = 0
+        # One try around the loop; line_num says where a failure happened
+        try:
+            with io.StringIO(data.decode("utf-8")) as f:
+                for line_num, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line or line[0] == "#":
+                        continue
+                    
+                    # Parse: <step> <opcode> <args>; str.split scans in C
+                    parts = line.split(None, 2)
+                    if len(parts) != 3 or not parts[0].isdigit():
+                        raise ValueError(f"Invalid transform line: {line}")
+                    entry = dispatch.get(parts[1])
+                    if entry is None:
+                        raise ValueError(f"Unknown opcode: {parts[1]}")
+                    op_id, parse = entry
+                    a, b = parse(parts[2])
+                    append((line_num, op_id, a, b))
+        except Exception as e:
+            raise ValueError(f"Transform line {line_num}: {e}")
         
-        for cid in to_remove:
-            self.formula.remove_clause(cid)
+        steps = tuple(steps)
+        if len(_STEP_CACHE) >= _STEP_CACHE_SIZE:
+            # Evict the oldest entry (dicts keep insertion order)
+            del _STEP_CACHE[next(iter(_STEP_CACHE))]
+        _STEP_CACHE[key] = steps
+        return steps
     
-    def _handle_var_subst(self, args: str):
-        """Handle var_subst v = expr"""
-        m = re.match(r"(\d+)\s*=\s*(.*)", args)
+    def _parse_var_rename(self, args: str) -> Tuple[int, int]:
+        """Parse var_rename old new"""
+        parts = args.split()
+        return int(parts[0]), int(parts[1])
+    
+    def _parse_var_elim(self, args: str) -> Tuple[int, None]:
+        """Parse var_elim v reason"""
+        return int(args.split(None, 1)[0]), None
+    
+    def _parse_var_subst(self, args: str) -> Tuple[int, str]:
+        """Parse var_subst v = expr"""
+        m = _RE_SUBST.match(args)
         if not m:
             raise ValueError(f"Invalid var_subst args: {args}")
-        
-        var = int(m.group(1))
-        expr = m.group(2)
-        self.formula.substitute_var(var, expr)
-        
-        # Remove clauses containing this variable
-        to_remove = []
-        for cid, clause in self.formula.clause_ids.items():
-            if any(abs(lit) == var for lit in clause):
-                to_remove.append(cid)
-        
-        for cid in to_remove:
-            self.formula.remove_clause(cid)
-    
-    def _handle_clause_remove(self, args: str):
-        """Handle clause_remove id reason"""
-        parts = args.split(maxsplit=1)
-        clause_id = int(parts[0])
-        reason = parts[1] if len(parts) > 1 else ""
-        self.formula.remove_clause(clause_id)
-    
-    def _handle_clause_add(self, args: str):
-        """Handle clause_add [l1 l2 ... lk] source"""
-        # Parse clause: [l1 l2 ... lk]
-        m = re.search(r"\[([^\]]*)\]", args)
+        return int(m.group(1)), m.group(2)
+    
+    def _parse_clause_remove(self, args: str) -> Tuple[int, None]:
+        """Parse clause_remove id reason"""
+        return int(args.split(None, 1)[0]), None
+    
+    def _parse_clause_add(self, args: str) -> Tuple[array, None]:
+        """Parse clause_add [l1 l2 ... lk] source"""
+        m = _RE_CLAUSE.search(args)
         if not m:
             raise ValueError(f"Invalid clause_add args: {args}")
-        
-        literals = [int(x) for x in m.group(1).split()]
-        self.formula.add_clause(literals)
+        return array("i", map(int, m.group(1).split())), None
     
-    def _handle_clause_strengthen(self, args: str):
-        """Handle clause_strengthen old_id [new_clause]"""
-        parts = args.split(maxsplit=1)
-        clause_id = int(parts[0])
-        
-        # Parse new clause
-        m = re.search(r"\[([^\]]*)\]", parts[1])
+    def _parse_clause_strengthen(self, args: str) -> Tuple[int, array]:
+        """Parse clause_strengthen old_id [new_clause]"""
+        clause_id = int(args.split(None, 1)[0])
+        m = _RE_CLAUSE.search(args)
         if not m:
             raise ValueError(f"Invalid clause_strengthen args: {args}")
-        
-        literals = [int(x) for x in m.group(1).split()]
-        self.formula.strengthen_clause(clause_id, literals)
+        return clause_id, array("i", map(int, m.group(1).split()))
     
-    def _handle_unit_derive(self, args: str):
-        """Handle unit_derive lit source_clause"""
-        parts = args.split()
-        literal = int(parts[0])
-        source = int(parts[1]) if len(parts) > 1 else 0
-        self.formula.add_unit(literal)
+    def _parse_unit_derive(self, args: str) -> Tuple[int, None]:
+        """Parse unit_derive lit source_clause"""
+        return int(args.split(None, 1)[0]), None
     
     def write_simplified(self, output_path: str):
         """Write simplified formula to DIMACS file."""
-        dimacs = self.formula.to_dimacs()
         with open(output_path, "w") as f:
-            f.write(dimacs)
+            self.formula.write_dimacs(f)
+
+
+def apply_steps(formula: CNFFormula, steps: Iterable[Tuple[int, int, Any, Any]]):
+    """
+    Apply a parsed step stream to a formula.
+    
+    Operands are already ints/arrays, so the loop is only integer
+    comparisons and CNFFormula calls; see STTFReplayEngine.parse_steps.
+    
+    Raises:
+        ValueError: If a step cannot be applied (reports its log line)
+    """
+    rename_var = formula.rename_var
+    remove_clause = formula.remove_clause
+    add_clause = formula.add_clause
+    remove_clauses_with_var = formula.remove_clauses_with_var
+    occ = formula.occ
+    line_num = 0
+    try:
+        for line_num, op, a, b in steps:
+            if op == _OP_VAR_RENAME:
+                rename_var(a, b)
+            elif op == _OP_VAR_ELIM or op == _OP_VAR_SUBST:
+                if op == _OP_VAR_ELIM:
+                    formula.eliminate_var(a)
+                else:
+                    formula.substitute_var(a, b)
+                # Remove clauses containing this variable, if any remain
+                if a in occ:
+                    remove_clauses_with_var(a)
+            elif op == _OP_CLAUSE_REMOVE:
+                remove_clause(a)
+            elif op == _OP_CLAUSE_ADD:
+                add_clause(a)
+            elif op == _OP_CLAUSE_STRENGTHEN:
+                formula.strengthen_clause(a, b)
+            elif op == _OP_UNIT_DERIVE:
+                formula.add_unit(a)
+            else:
+                raise ValueError(f"Unknown op id: {op}")
+    except Exception as e:
+        raise ValueError(f"Transform line {line_num}: {e}")
 
 
 def replay_bundle(bundle_path: str, output_path: Optional[str] = None) -> CNFFormula:
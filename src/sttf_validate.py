@@ -6,8 +6,9 @@ Command-line tool for validating STTF bundle compliance.
 
 import sys
 import argparse
+from collections import Counter
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent))
@@ -16,6 +17,39 @@ from sttf_core import STTFBundle
 from sttf_replay import STTFReplayEngine
 
 
+# Files every bundle must contain
+_REQUIRED_FILES = (
+    "original.cnf", "simplified.cnf", "transform.log",
+    "reconstruct.map", "manifest.json",
+)
+
+
+def normalize_cnf(text: str) -> Tuple[Optional[Tuple[str, ...]], Counter]:
+    """
+    Canonicalize DIMACS text for comparison.
+    
+    Clauses are reduced the way CNFFormula.add_clause stores them:
+    repeated literals collapse, tautologies are kept.
+    
+    Returns:
+        (header tokens or None, Counter of clauses), each clause being the
+        sorted tuple of its distinct integer literals
+    """
+    header = None
+    clauses = Counter()
+    for line in text.splitlines():
+        parts = line.split()
+        if not parts or parts[0][0] == "c":
+            continue
+        if parts[0] == "p":
+            header = tuple(parts)
+            continue
+        lits = set(map(int, parts))
+        lits.discard(0)
+        clauses[tuple(sorted(lits))] += 1
+    return header, clauses
+
+
 def validate_bundle(bundle_path: str, verbose: bool = False) -> bool:
     """
     Validate an STTF bundle for compliance.
@@ -30,6 +64,13 @@ def validate_bundle(bundle_path: str, verbose: bool = False) -> bool:
     print(f"Validating STTF bundle: {bundle_path}")
     print("=" * 60)
     
+    # Fail fast on missing files before parsing anything
+    root = Path(bundle_path)
+    for name in _REQUIRED_FILES:
+        if not (root / name).is_file():
+            print(f"✗ ERROR: Required STTF file missing: {root / name}")
+            return False
+    
     try:
         # Load bundle
         if verbose:
@@ -94,8 +135,8 @@ def validate_bundle(bundle_path: str, verbose: bool = False) -> bool:
         return False
     except Exception as e:
         print(f"✗ ERROR: Unexpected error: {e}")
-        import traceback
         if verbose:
+            import traceback
             traceback.print_exc()
         return False
 
@@ -134,29 +175,23 @@ def validate_with_replay(bundle_path: str, verbose: bool = False) -> bool:
         with open(simplified_expected) as f:
             expected_dimacs = f.read()
         
-        # Compare (normalize whitespace)
-        def normalize_cnf(text):
-            lines = []
-            for line in text.strip().split('\n'):
-                line = line.strip()
-                if line and not line.startswith('c'):
-                    # Normalize spacing
-                    parts = line.split()
-                    lines.append(' '.join(parts))
-            return sorted(lines)
-        
-        replayed_lines = normalize_cnf(replayed_dimacs)
-        expected_lines = normalize_cnf(expected_dimacs)
-        
-        if replayed_lines == expected_lines:
+        # Compare headers, then clauses as multisets (order of clauses and
+        # literals ignored)
+        replayed_header, replayed_clauses = normalize_cnf(replayed_dimacs)
+        expected_header, expected_clauses = normalize_cnf(expected_dimacs)
+        
+        if replayed_header == expected_header and replayed_clauses == expected_clauses:
             print("✓ Replay produces correct simplified.cnf")
             return True
         else:
             print("✗ Replay output differs from expected simplified.cnf")
             if verbose:
                 print("\nDifferences found:")
-                print(f"  Expected {len(expected_lines)} lines")
-                print(f"  Replayed {len(replayed_lines)} lines")
+                if replayed_header != expected_header:
+                    print(f"  Expected header {' '.join(expected_header or ('(missing)',))}")
+                    print(f"  Replayed header {' '.join(replayed_header or ('(missing)',))}")
+                print(f"  Expected {sum(expected_clauses.values())} clauses")
+                print(f"  Replayed {sum(replayed_clauses.values())} clauses")
             return False
             
     except Exception as e:
@@ -0,0 +1,11 @@
+"""
+pytest configuration: make the src/ modules importable once per session.
+"""
+
+import sys
+from pathlib import Path
+
+_SRC = str(Path(__file__).parent.parent / "src")
+
+if "sttf_core" not in sys.modules and _SRC not in sys.path:
+    sys.path.insert(0, _SRC)
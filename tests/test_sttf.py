@@ -3,19 +3,48 @@ STTF Test Suite
 Comprehensive tests for the STTF implementation.
 """
 
+import io
+import os
+import argparse
 import unittest
 import tempfile
 import shutil
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import sys
 
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+# Under pytest, conftest.py has already put src/ on the path; the check
+# keeps direct runs (python tests/test_sttf.py) working without re-adding it
+_SRC = str(Path(__file__).parent.parent / "src")
+if _SRC not in sys.path:
+    sys.path.insert(0, _SRC)
 
-from sttf_core import Expr, STTFBundle
+from sttf_core import Expr, STTFBundle, pack_model, parse_expr, unpack_model
 from sttf_replay import STTFReplayEngine, CNFFormula
 from sttf_generate import STTFBundleGenerator
 
 
+class _BundleTestCase(unittest.TestCase):
+    """
+    Base for tests that write bundles.
+    
+    One temp base per class (on tmpfs when available) holds a fresh
+    subdirectory per test and is removed once, after the class runs.
+    """
+    
+    @classmethod
+    def setUpClass(cls):
+        shm = "/dev/shm"
+        cls._base_dir = tempfile.mkdtemp(dir=shm if os.path.isdir(shm) else None)
+    
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls._base_dir, ignore_errors=True)
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(dir=self._base_dir)
+
+
 class TestExpr(unittest.TestCase):
     """Test boolean expression evaluator."""
     
@@ -75,6 +104,144 @@ class TestExpr(unittest.TestCase):
         self.assertTrue(expr.eval({1: True, 2: True, 3: False, 4: False}))
         self.assertTrue(expr.eval({1: False, 2: False, 3: False, 4: True}))
         self.assertFalse(expr.eval({1: False, 2: True, 3: True, 4: False}))
+    
+    def test_compiled_matches_interpreted(self):
+        text = "OR(AND(1, -2), XOR(NOT(3), 4))"
+        plain = Expr(text)
+        compiled = Expr(text).compile()
+        for bits in range(16):
+            model = {v: bool(bits >> (v - 1) & 1) for v in range(1, 5)}
+            self.assertEqual(compiled.eval(model), plain.eval(model))
+        with self.assertRaises(ValueError):
+            compiled.eval({1: True})
+    
+    def test_fold_constants(self):
+        expr = Expr("OR(AND(NOT(4), 7), XOR(4, 2))")
+        folded = expr.fold({4: False})
+        self.assertFalse(folded.is_constant)
+        for a in (True, False):
+            for b in (True, False):
+                model = {2: a, 7: b}
+                self.assertEqual(folded.eval(model),
+                                 expr.eval({4: False, 2: a, 7: b}))
+        
+        self.assertTrue(Expr("AND(NOT(4), 5)").fold({4: False, 5: True}).is_constant)
+        self.assertIs(expr.fold({9: True}), expr)
+    
+    def test_short_circuit(self):
+        # The right operand is skipped, so its variable need not be defined
+        self.assertFalse(Expr("AND(1, 2)").eval({1: False}))
+        self.assertTrue(Expr("OR(-1, AND(2, 3))").eval({1: False}))
+        with self.assertRaises(ValueError):
+            Expr("AND(1, 2)").eval({1: True})
+    
+    def test_reorder(self):
+        expr = Expr("AND(OR(1, 2), 3)")
+        reordered = expr.reorder({1: 0.1, 2: 0.9, 3: 0.2})
+        self.assertEqual(reordered.root, ("AND", ("LIT", 3, False),
+                                          ("OR", ("LIT", 2, False), ("LIT", 1, False))))
+        self.assertFalse(reordered.eval({3: False}))
+        self.assertIs(expr.reorder({1: 0.9, 2: 0.1, 3: 0.95}), expr)
+    
+    def test_eval_bits(self):
+        expr = Expr("OR(AND(1, -2), XOR(NOT(3), 4))")
+        for bits in range(16):
+            model = {v: bool(bits >> (v - 1) & 1) for v in range(1, 5)}
+            mask, values = pack_model(model)
+            self.assertEqual(expr.eval_bits(mask, values), int(expr.eval(model)))
+        with self.assertRaises(ValueError):
+            expr.eval_bits(0b110, 0b110)
+    
+    def test_eval_mask(self):
+        expr = Expr("XOR(1, AND(-2, 3))")
+        # 1 True, 2 False, 3 True
+        self.assertFalse(expr.eval_mask(0b1010, 0b0100))
+        with self.assertRaises(ValueError):
+            expr.eval_mask(0b0010, 0b0100)
+        # Single mask: unset bits are False
+        self.assertTrue(expr.eval_mask(0b1000))
+        self.assertFalse(expr.eval_mask(0b1010))
+    
+    def test_eval_all(self):
+        self.assertEqual(Expr("AND(1, 2)").eval_all([1, 2]), 0b1000)
+        self.assertEqual(Expr("OR(1, 2)").eval_all([1, 2]), 0b1110)
+        self.assertEqual(Expr("XOR(1, 2)").eval_all([1, 2]), 0b0110)
+        self.assertEqual(Expr("NOT(2)").eval_all([1, 2]), 0b0011)
+        with self.assertRaises(ValueError):
+            Expr("AND(1, 3)").eval_all([1, 2])
+    
+    def test_eval_batch(self):
+        expr = Expr("OR(AND(1, -2), XOR(NOT(3), 4))")
+        models = [{v: bool(bits >> (v - 1) & 1) for v in range(1, 5)}
+                  for bits in range(16)]
+        self.assertEqual(expr.eval_batch(models),
+                         [expr.eval(model) for model in models])
+        self.assertEqual(expr.eval_batch([]), [])
+        with self.assertRaises(ValueError):
+            expr.eval_batch(models + [{1: True}])
+    
+    def test_eval_matrix(self):
+        expr = Expr("OR(AND(1, 2), NOT(3))")
+        rows = [[True, True, True], [False, True, True], [False, False, False]]
+        self.assertEqual(expr.eval_matrix(rows, {1: 0, 2: 1, 3: 2}), [True, False, True])
+        with self.assertRaises(ValueError):
+            expr.eval_matrix(rows, {1: 0, 2: 1})
+    
+    def test_pack_model_roundtrip(self):
+        model = {1: True, 3: False, 70: True}
+        self.assertEqual(pack_model(model), ((1 << 1) | (1 << 3) | (1 << 70),
+                                             (1 << 1) | (1 << 70)))
+        self.assertEqual(unpack_model(*pack_model(model)), model)
+    
+    def test_parse_expr_memoized(self):
+        expr = parse_expr("AND(1, NOT(2))")
+        self.assertIs(parse_expr("AND(1, NOT(2))"), expr)
+        self.assertTrue(expr.eval({1: True, 2: False}))
+    
+    def test_invalid_expression(self):
+        with self.assertRaises(ValueError):
+            Expr("AND(1)")
+        with self.assertRaises(ValueError):
+            Expr("FOO(1, 2)")
+        with self.assertRaises(ValueError):
+            Expr("NOT(3) 4")
+        with self.assertRaises(ValueError):
+            Expr("AND(1, 2(")
+        with self.assertRaises(ValueError):
+            Expr("NOT(1(")
+        with self.assertRaises(ValueError):
+            Expr("(1)")
+    
+    def test_deeply_nested_expression(self):
+        text = "1"
+        for _ in range(5000):
+            text = f"NOT({text})"
+        self.assertTrue(Expr(text).eval({1: True}))
+        
+        # fold and reorder walk the tree without recursing
+        self.assertTrue(Expr(text).fold({2: True}).eval({1: True}))
+        deep = Expr(f"AND({text}, 2)")
+        reordered = deep.reorder({1: 0.9, 2: 0.1})
+        self.assertEqual(reordered.root[1], ("LIT", 2, False))
+        self.assertFalse(reordered.eval({1: True, 2: False}))
+    
+    def test_deep_expression_compile_failure_cached(self):
+        text = "1"
+        for _ in range(300):
+            text = f"AND(1, {text})"
+        expr = Expr(text)
+        for _ in range(2):
+            self.assertEqual(expr.eval_bits(0b10, 0b10), 1)
+            self.assertEqual(expr.eval_batch([{1: True}, {1: False}]), [True, False])
+        # The failed builds are remembered, not retried per call
+        self.assertIs(expr._bits_fn, False)
+        self.assertIs(expr._lanes_fn, False)
+        self.assertIsNone(expr.compile()._fn)
+    
+    def test_undefined_variable(self):
+        expr = Expr("OR(1, 2)")
+        with self.assertRaises(ValueError):
+            expr.eval({1: False})
 
 
 class TestCNFFormula(unittest.TestCase):
@@ -86,6 +253,38 @@ class TestCNFFormula(unittest.TestCase):
         self.assertEqual(len(cnf.clauses), 1)
         self.assertIn(cid, cnf.clause_ids)
     
+    def test_add_clause_after_explicit_ids(self):
+        cnf = CNFFormula()
+        cnf.add_clause([1, 2], 1)
+        cnf.add_clause([-1, 3], 2)
+        cid = cnf.add_clause([2, 3])
+        self.assertEqual(cid, 3)
+        self.assertEqual(cnf.clauses, [[1, 2], [-1, 3], [2, 3]])
+    
+    def test_clauses_indexing(self):
+        cnf = CNFFormula()
+        for clause in ([1, 2], [-1, 3], [2, 3]):
+            cnf.add_clause(clause)
+        self.assertEqual(cnf.clauses[0], [1, 2])
+        self.assertEqual(cnf.clauses[-1], [2, 3])
+        self.assertEqual(cnf.clauses[1:], [[-1, 3], [2, 3]])
+        with self.assertRaises(IndexError):
+            cnf.clauses[3]
+    
+    def test_add_clause_normalizes(self):
+        cnf = CNFFormula()
+        cnf.add_clause([2, 1, 2, -3])
+        cid = cnf.add_clause([1, -1, 4])
+        # Tautologies are kept so their IDs stay addressable
+        self.assertEqual(cnf.clauses, [[2, 1, -3], [1, -1, 4]])
+        self.assertEqual(cnf.add_clause([5]), cid + 1)
+    
+    def test_strengthen_tautology(self):
+        cnf = CNFFormula()
+        cnf.add_clauses([[1, -1, 2], [3]], 1)
+        cnf.strengthen_clause(1, [2])
+        self.assertEqual(cnf.clauses, [[2], [3]])
+    
     def test_remove_clause(self):
         cnf = CNFFormula()
         cid = cnf.add_clause([1, 2, 3])
@@ -103,6 +302,18 @@ class TestCNFFormula(unittest.TestCase):
         self.assertIn([10, -2, 3], cnf.clauses)
         self.assertIn([-10, 2], cnf.clauses)
     
+    def test_occurrence_lists(self):
+        cnf = CNFFormula()
+        a = cnf.add_clause([1, -2, 3])
+        b = cnf.add_clause([-1, 2])
+        cnf.strengthen_clause(a, [-2, 3])
+        self.assertEqual(cnf.clauses_with_var(1), [b])
+        cnf.rename_var(2, 20)
+        self.assertEqual(sorted(cnf.clauses_with_var(20)), [a, b])
+        self.assertEqual(cnf.clauses_with_var(2), [])
+        cnf.remove_clause(b)
+        self.assertEqual(cnf.clauses_with_var(1), [])
+    
     def test_eliminate_var(self):
         cnf = CNFFormula()
         cnf.eliminate_var(5)
@@ -115,6 +326,16 @@ class TestCNFFormula(unittest.TestCase):
         active = cnf.get_active_vars()
         self.assertEqual(active, {1, 2, 3, 4})
     
+    def test_max_active_var(self):
+        cnf = CNFFormula()
+        cnf.add_clause([1, -7])
+        cid = cnf.add_clause([2, 9])
+        self.assertEqual(cnf.max_active_var(), 9)
+        cnf.remove_clause(cid)
+        self.assertEqual(cnf.max_active_var(), 7)
+        cnf.rename_var(7, 3)
+        self.assertEqual(cnf.max_active_var(), 3)
+    
     def test_to_dimacs(self):
         cnf = CNFFormula()
         cnf.add_clause([1, 2])
@@ -126,15 +347,9 @@ class TestCNFFormula(unittest.TestCase):
         self.assertIn("-1 3 0", dimacs)
 
 
-class TestSTTFBundleGeneration(unittest.TestCase):
+class TestSTTFBundleGeneration(_BundleTestCase):
     """Test STTF bundle generation."""
     
-    def setUp(self):
-        self.temp_dir = tempfile.mkdtemp()
-    
-    def tearDown(self):
-        shutil.rmtree(self.temp_dir)
-    
     def test_generate_simple_bundle(self):
         gen = STTFBundleGenerator(self.temp_dir)
         gen.set_original_cnf(3, [[1, 2], [-1, 3], [-2, -3]])
@@ -149,6 +364,16 @@ class TestSTTFBundleGeneration(unittest.TestCase):
         self.assertTrue((bundle_path / "reconstruct.map").exists())
         self.assertTrue((bundle_path / "manifest.json").exists())
     
+    def test_compute_simplified_cnf(self):
+        gen = STTFBundleGenerator(self.temp_dir)
+        gen.set_original_cnf(4, [[1, 2], [-1, 3], [-2, -4], [3, 4]])
+        gen.add_var_rename(1, 5)
+        gen.add_var_rename(5, 6)
+        gen.add_var_elim(4, "pure")
+        num_vars, clauses = gen.compute_simplified_cnf()
+        self.assertEqual(clauses, [[6, 2], [-6, 3]])
+        self.assertEqual(num_vars, 6)
+    
     def test_bundle_loads(self):
         gen = STTFBundleGenerator(self.temp_dir)
         gen.set_original_cnf(3, [[1, 2], [-1, 3]])
@@ -159,17 +384,21 @@ class TestSTTFBundleGeneration(unittest.TestCase):
         bundle = STTFBundle(self.temp_dir)
         self.assertIsNotNone(bundle.manifest_data)
         self.assertGreater(len(bundle.transform_steps), 0)
+    
+    def test_bundle_clauses(self):
+        gen = STTFBundleGenerator(self.temp_dir)
+        gen.set_original_cnf(3, [[1, 2], [-1, 3], [2, -3]])
+        gen.add_var_elim(3, "test")
+        gen.write_bundle()
+        
+        bundle = STTFBundle(self.temp_dir)
+        self.assertEqual(bundle.original_clauses, [[1, 2], [-1, 3], [2, -3]])
+        self.assertEqual(bundle.simplified_clauses, [[1, 2]])
 
 
-class TestSTTFReplay(unittest.TestCase):
+class TestSTTFReplay(_BundleTestCase):
     """Test replay engine."""
     
-    def setUp(self):
-        self.temp_dir = tempfile.mkdtemp()
-    
-    def tearDown(self):
-        shutil.rmtree(self.temp_dir)
-    
     def test_replay_var_rename(self):
         # Create test bundle
         gen = STTFBundleGenerator(self.temp_dir)
@@ -206,17 +435,34 @@ class TestSTTFReplay(unittest.TestCase):
         
         # Variable 3 should be eliminated
         self.assertIn(3, formula.eliminated_vars)
+    
+    def test_parsed_steps_reused(self):
+        gen = STTFBundleGenerator(self.temp_dir)
+        gen.set_original_cnf(3, [[1, 2], [-1, 3]])
+        gen.add_var_rename(1, 10)
+        gen.write_bundle()
+        
+        original = str(Path(self.temp_dir) / "original.cnf")
+        log = Path(self.temp_dir) / "transform.log"
+        steps = STTFReplayEngine(original, str(log)).parse_steps()
+        self.assertIs(STTFReplayEngine(original, str(log)).parse_steps(), steps)
+        
+        # Rewriting the log invalidates the cached stream
+        log.write_text(log.read_text() + "2 var_elim 3 pure\n")
+        formula = STTFReplayEngine(original, str(log)).replay_transformation()
+        self.assertIn(3, formula.eliminated_vars)
+        
+        # Even when the rewrite keeps the size and mtime
+        st = log.stat()
+        log.write_text(log.read_text().replace("var_elim 3", "var_elim 2"))
+        os.utime(log, ns=(st.st_atime_ns, st.st_mtime_ns))
+        formula = STTFReplayEngine(original, str(log)).replay_transformation()
+        self.assertIn(2, formula.eliminated_vars)
 
 
-class TestModelLifting(unittest.TestCase):
+class TestModelLifting(_BundleTestCase):
     """Test model lifting from simplified to original CNF."""
     
-    def setUp(self):
-        self.temp_dir = tempfile.mkdtemp()
-    
-    def tearDown(self):
-        shutil.rmtree(self.temp_dir)
-    
     def test_lift_with_rename(self):
         gen = STTFBundleGenerator(self.temp_dir)
         gen.set_original_cnf(3, [[1, 2], [-1, 3]])
@@ -270,22 +516,168 @@ class TestModelLifting(unittest.TestCase):
         # Variable 4 should be computed from OR(1, 2)
         self.assertIn(4, model_A)
         self.assertTrue(model_A[4])  # OR(True, False) = True
-
-
-class TestEndToEnd(unittest.TestCase):
-    """End-to-end integration tests."""
     
-    def setUp(self):
-        self.temp_dir = tempfile.mkdtemp()
+    def test_lift_with_folded_substitution(self):
+        gen = STTFBundleGenerator(self.temp_dir)
+        gen.set_original_cnf(5, [[1, 2], [-1, 3], [4], [5]])
+        gen.add_var_elim(4, "pure")
+        gen.add_var_subst(5, "OR(4, NOT(4))")
+        gen.write_bundle()
+        
+        bundle = STTFBundle(self.temp_dir)
+        model_A = bundle.lift_model({1: True, 2: False, 3: True})
+        
+        self.assertFalse(model_A[4])
+        self.assertTrue(model_A[5])
+    
+    def test_lift_with_shared_subexpressions(self):
+        gen = STTFBundleGenerator(self.temp_dir)
+        gen.set_original_cnf(6, [[1, 2, 3], [2, 3, 6]])
+        gen.add_var_subst(4, "OR(AND(1, 2), 3)")
+        gen.add_var_subst(1, "XOR(AND(1, 2), 3)")
+        gen.add_var_subst(5, "AND(AND(1, 2), NOT(4))")
+        gen.write_bundle()
+        
+        bundle = STTFBundle(self.temp_dir)
+        for bits in range(8):
+            model_B = {v: bool(bits >> (v - 1) & 1) for v in (1, 2, 3)}
+            # Reference: apply the same rules with independent Exprs
+            expected = dict(model_B)
+            expected[4] = Expr("OR(AND(1, 2), 3)").eval(expected)
+            expected[1] = Expr("XOR(AND(1, 2), 3)").eval(expected)
+            expected[5] = Expr("AND(AND(1, 2), NOT(4))").eval(expected)
+            self.assertEqual(bundle.lift_model(model_B), expected)
+    
+    def test_lift_with_cached_expression(self):
+        gen = STTFBundleGenerator(self.temp_dir)
+        gen.set_original_cnf(4, [[1, 2], [-1, 3], [4]])
+        gen.add_var_subst(4, "OR(AND(1, 2), AND(NOT(1), NOT(2)))")
+        gen.write_bundle()
+        
+        bundle = STTFBundle(self.temp_dir)
+        
+        # Second round is served from the cache and must agree
+        for _ in range(2):
+            for a in (True, False):
+                for b in (True, False):
+                    model_A = bundle.lift_model({1: a, 2: b, 3: False})
+                    self.assertEqual(model_A[4], a == b)
+        with self.assertRaises(ValueError):
+            bundle.lift_model({1: True, 3: False})
+    
+    def test_lift_cached_expression_partial_model(self):
+        gen = STTFBundleGenerator(self.temp_dir)
+        gen.set_original_cnf(5, [[1, 3], [5]])
+        gen.add_var_subst(5, "OR(1, AND(AND(3, 3), 3))")
+        gen.write_bundle()
+        
+        bundle = STTFBundle(self.temp_dir)
+        
+        # OR short-circuits on 1, so the missing 3 is never read
+        self.assertEqual(bundle.lift_model({1: True}), {1: True, 5: True})
+        with self.assertRaises(ValueError):
+            bundle.lift_model({1: False})
+    
+    def test_lift_with_deep_expressions(self):
+        deep = "1"
+        for _ in range(3000):
+            deep = f"AND(2, {deep})"
+        gen = STTFBundleGenerator(self.temp_dir)
+        gen.set_original_cnf(5, [[1, 2], [4], [5]])
+        gen.add_var_elim(3, "pure")
+        gen.add_var_subst(4, f"OR(3, {deep})")
+        gen.add_var_subst(5, f"XOR({deep}, 2)")
+        gen.write_bundle()
+        
+        # Folding and subexpression sharing at load time must not recurse
+        bundle = STTFBundle(self.temp_dir)
+        model_A = bundle.lift_model({1: True, 2: True})
+        self.assertTrue(model_A[4])
+        self.assertFalse(model_A[5])
+    
+    def test_lift_model_bits(self):
+        gen = STTFBundleGenerator(self.temp_dir)
+        gen.set_original_cnf(5, [[1, 2], [-1, 3], [4], [5]])
+        gen.add_var_rename(1, 10)
+        gen.add_var_elim(5, "pure")
+        gen.add_var_subst(4, "XOR(1, NOT(2))")
+        gen.write_bundle()
+        
+        bundle = STTFBundle(self.temp_dir)
+        for bits in range(8):
+            model_B = {10: bool(bits & 1), 2: bool(bits & 2), 3: bool(bits & 4)}
+            lifted = bundle.lift_model_bits(*pack_model(model_B))
+            self.assertEqual(unpack_model(*lifted), bundle.lift_model(model_B))
+        
+        # XOR reads both operands, so a partial model still raises
+        with self.assertRaises(ValueError):
+            bundle.lift_model_bits(*pack_model({10: True, 3: False}))
     
-    def tearDown(self):
-        shutil.rmtree(self.temp_dir)
+    def test_lift_model_bits_partial_model(self):
+        gen = STTFBundleGenerator(self.temp_dir)
+        gen.set_original_cnf(3, [[1, 2], [3]])
+        gen.add_var_subst(3, "OR(1, 2)")
+        gen.write_bundle()
+        
+        bundle = STTFBundle(self.temp_dir)
+        lifted = bundle.lift_model_bits(*pack_model({1: True}))
+        self.assertEqual(unpack_model(*lifted), bundle.lift_model({1: True}))
     
-    def test_full_pipeline(self):
-        """Test: generate -> validate -> replay -> lift"""
+    def test_lift_model_batch(self):
+        gen = STTFBundleGenerator(self.temp_dir)
+        gen.set_original_cnf(5, [[1, 2], [-1, 3], [4], [5]])
+        gen.add_var_rename(1, 10)
+        gen.add_var_subst(5, "XOR(AND(2, 3), OR(NOT(2), AND(2, NOT(3))))")
+        gen.add_var_subst(4, "AND(OR(1, 2), NOT(3))")
+        gen.write_bundle()
+        
+        bundle = STTFBundle(self.temp_dir)
+        models_B = [{10: bool(bits & 1), 2: bool(bits & 2), 3: bool(bits & 4)}
+                    for bits in range(8)]
+        self.assertEqual(bundle.lift_model_batch(models_B),
+                         [bundle.lift_model(model) for model in models_B])
+    
+    def test_lift_model_batch_partial_model(self):
+        gen = STTFBundleGenerator(self.temp_dir)
+        gen.set_original_cnf(4, [[1, 2], [2, 3], [4]])
+        # Enough literals per variable to take the eval_batch path
+        gen.add_var_subst(4, "AND(2, XOR(OR(3, AND(2, 3)), AND(OR(2, 3), OR(3, 2))))")
+        gen.write_bundle()
         
-        # 1. Generate bundle
+        bundle = STTFBundle(self.temp_dir)
+        # The last model lacks 3, which AND never reads once 2 is False
+        models_B = [{1: True, 2: True, 3: False}, {1: False, 2: False}]
+        self.assertEqual(bundle.lift_model_batch(models_B),
+                         [bundle.lift_model(model) for model in models_B])
+        with self.assertRaises(ValueError):
+            bundle.lift_model_batch([{1: True, 2: True}])
+    
+    def test_lift_as_view(self):
         gen = STTFBundleGenerator(self.temp_dir)
+        gen.set_original_cnf(4, [[1, 2], [-1, 3], [4]])
+        gen.add_var_rename(1, 10)
+        gen.add_var_subst(4, "OR(1, 2)")
+        gen.write_bundle()
+        
+        bundle = STTFBundle(self.temp_dir)
+        model_B = {10: False, 2: True, 3: False}
+        
+        view = bundle.lift_model(model_B, as_view=True)
+        
+        # Same values as the copying path, without touching model_B
+        self.assertEqual(dict(view), bundle.lift_model(model_B))
+        self.assertEqual(model_B, {10: False, 2: True, 3: False})
+
+
+class TestEndToEnd(_BundleTestCase):
+    """End-to-end integration tests."""
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Generate the pipeline bundle once; tests only read it
+        cls.fixture_dir = tempfile.mkdtemp(dir=cls._base_dir)
+        gen = STTFBundleGenerator(cls.fixture_dir)
         gen.set_original_cnf(
             num_vars=5,
             clauses=[
@@ -301,18 +693,25 @@ class TestEndToEnd(unittest.TestCase):
         gen.add_clause_remove(5, "unit_5")
         gen.add_var_rename(1, 10)
         gen.write_bundle()
+        cls.bundle = STTFBundle(cls.fixture_dir)
+    
+    def _replay(self):
+        engine = STTFReplayEngine(
+            str(Path(self.fixture_dir) / "original.cnf"),
+            str(Path(self.fixture_dir) / "transform.log")
+        )
+        return engine.replay_transformation()
+    
+    def test_full_pipeline(self):
+        """Test: generate -> validate -> replay -> lift"""
         
-        # 2. Load and validate
-        bundle = STTFBundle(self.temp_dir)
+        # 1. Bundle generated in setUpClass; 2. Load and validate
+        bundle = self.bundle
         self.assertIsNotNone(bundle)
         self.assertEqual(bundle.manifest_data["version"], "1.0")
         
         # 3. Replay transformation
-        engine = STTFReplayEngine(
-            str(Path(self.temp_dir) / "original.cnf"),
-            str(Path(self.temp_dir) / "transform.log")
-        )
-        formula = engine.replay_transformation()
+        formula = self._replay()
         self.assertIsNotNone(formula)
         
         # 4. Create and lift a model
@@ -327,20 +726,58 @@ class TestEndToEnd(unittest.TestCase):
         print(f"✓ Full pipeline test passed")
         print(f"  Model B: {model_B}")
         print(f"  Model A: {model_A}")
+    
+    def test_replay_matches_simplified(self):
+        replayed = sorted(sorted(c) for c in self._replay().clauses)
+        expected = sorted(sorted(c) for c in self.bundle.simplified_clauses)
+        self.assertEqual(replayed, expected)
+
+
+# Test classes in run order
+TEST_CLASSES = [
+    TestExpr,
+    TestCNFFormula,
+    TestSTTFBundleGeneration,
+    TestSTTFReplay,
+    TestModelLifting,
+    TestEndToEnd,
+]
 
 
-def run_tests():
-    """Run all tests."""
+def _run_class(name: str):
+    """Run one test class in a worker; return (output, run, ok)."""
+    stream = io.StringIO()
+    suite = unittest.TestLoader().loadTestsFromTestCase(globals()[name])
+    result = unittest.TextTestRunner(stream=stream, verbosity=2).run(suite)
+    return stream.getvalue(), result.testsRun, result.wasSuccessful()
+
+
+def run_tests(jobs: int = 1):
+    """
+    Run all tests.
+    
+    Args:
+        jobs: Number of worker processes; with more than one, each test
+            class runs in its own process and reports are printed in order
+    """
+    if jobs > 1:
+        names = [cls.__name__ for cls in TEST_CLASSES]
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_run_class, names))
+        for output, _, _ in results:
+            sys.stderr.write(output)
+        total = sum(run for _, run, _ in results)
+        success = all(ok for _, _, ok in results)
+        print(f"{len(names)} classes, {total} tests: {'OK' if success else 'FAILED'}",
+              file=sys.stderr)
+        return success
+    
     loader = unittest.TestLoader()
     suite = unittest.TestSuite()
     
     # Add all test classes
-    suite.addTests(loader.loadTestsFromTestCase(TestExpr))
-    suite.addTests(loader.loadTestsFromTestCase(TestCNFFormula))
-    suite.addTests(loader.loadTestsFromTestCase(TestSTTFBundleGeneration))
-    suite.addTests(loader.loadTestsFromTestCase(TestSTTFReplay))
-    suite.addTests(loader.loadTestsFromTestCase(TestModelLifting))
-    suite.addTests(loader.loadTestsFromTestCase(TestEndToEnd))
+    for cls in TEST_CLASSES:
+        suite.addTests(loader.loadTestsFromTestCase(cls))
     
     runner = unittest.TextTestRunner(verbosity=2)
     result = runner.run(suite)
@@ -349,6 +786,11 @@ def run_tests():
 
 
 if __name__ == "__main__":
-    success = run_tests()
+    parser = argparse.ArgumentParser(description="Run the STTF test suite")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="Run test classes in this many processes (0 = one per CPU)"
+    )
+    args = parser.parse_args()
+    success = run_tests(args.jobs or os.cpu_count() or 1)
     sys.exit(0 if success else 1)
-